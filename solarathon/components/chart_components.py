@@ -0,0 +1,45 @@
+"""Candlestick chart drawn in the browser
+
+The server sends the candles and indicator series once, as binary buffers
+(float64 times, float32 values column after column), and ohlc_chart.vue draws
+them on a canvas. Zooming, panning and switching indicators happen in the
+browser, only a change of asset or interval sends data again. Candles that do
+not fit the width are aggregated by the browser, as in solarathon.market.downsample.
+"""
+import os
+from typing import Dict, List, Tuple
+
+import ipyvuetify
+import numpy as np
+import traitlets
+
+import solara
+
+
+class OHLCChartWidget(ipyvuetify.VuetifyTemplate):
+    template_file = os.path.realpath(os.path.join(os.path.dirname(__file__), "ohlc_chart.vue"))
+
+    title = traitlets.Unicode("").tag(sync=True)
+    # epoch milliseconds, float64
+    times = traitlets.Bytes(b"").tag(sync=True)
+    columns = traitlets.List(traitlets.Unicode()).tag(sync=True)
+    # float32, len(columns) arrays of len(times) values each
+    values = traitlets.Bytes(b"").tag(sync=True)
+    # series shown initially, the user can toggle them in the browser
+    visible = traitlets.List(traitlets.Unicode()).tag(sync=True)
+    # number of candles in view when the data (or this) changes
+    view = traitlets.CInt(0).tag(sync=True)
+
+
+def chart_buffers(times: np.ndarray, series: Dict[str, np.ndarray]) -> Tuple[bytes, List[str], bytes]:
+    """(times, columns, values) for OHLCChartWidget, times are datetime64."""
+    milliseconds = times.astype("M8[ms]").astype(np.float64)
+    values = np.empty((len(series), len(times)), dtype=np.float32)
+    for i, column in enumerate(series.values()):
+        values[i] = column
+    return milliseconds.tobytes(), list(series), values.tobytes()
+
+
+@solara.component
+def OHLCChart(title: str, times: bytes, columns: List[str], values: bytes, visible: List[str], view: int):
+    return OHLCChartWidget.element(title=title, times=times, columns=columns, values=values, visible=visible, view=view)
@@ -0,0 +1,115 @@
+"""Server side paged and sorted table for data frames
+
+Only the visible page of the frame is sent to the browser. Sorting is done on
+the server too, against a sort order per frame and column that is computed
+once, so paging, sorting and filtering (a row mask) do not copy or sort the
+frame per render.
+
+Based on
+https://github.com/widgetti/solara/blob/9dc4e6b282602664a7c73930ee64ddfd714594a5/solara/components/datatable.py
+"""
+import os
+from typing import Sequence
+
+import ipyvuetify
+import numpy as np
+import traitlets
+
+import solara
+
+from solarathon.util import FrameCache
+
+
+class TableWidget(ipyvuetify.VuetifyTemplate):
+    """Data table that renders the image columns (image URLs) as images."""
+    template_file = os.path.realpath(os.path.join(os.path.dirname(__file__), "table.vue"))
+
+    items = traitlets.Any().tag(sync=True)
+    headers = traitlets.Any().tag(sync=True)
+    total_length = traitlets.CInt().tag(sync=True)
+    options = traitlets.Any().tag(sync=True)
+    # "item.<column>" of the image columns
+    image_slots = traitlets.List().tag(sync=True)
+
+
+def _sort_order(df, column) -> np.ndarray:
+    values = df[column].to_numpy()
+    try:
+        order = np.argsort(values, kind="stable")
+    except TypeError:
+        # mixed types (e.g. None and str)
+        order = np.argsort(values.astype(str), kind="stable")
+    order.setflags(write=False)
+    return order
+
+
+_sort_orders: FrameCache[np.ndarray] = FrameCache(_sort_order)
+
+
+def sort_order(df, column) -> np.ndarray:
+    """Row positions of df sorted by column, computed once per frame and column.
+
+    A frame shared by all sessions (like the registry's) pays this once per
+    column, not per render or per filter.
+    """
+    return _sort_orders.get(df, column, key=column)
+
+
+def window(df, mask=None, sort_by=None, descending=False, start=0, stop=None) -> np.ndarray:
+    """Positions of the rows to show, for a page of the filtered and sorted frame."""
+    if sort_by is None:
+        rows = np.arange(len(df)) if mask is None else np.flatnonzero(mask)
+    else:
+        rows = sort_order(df, sort_by)
+        if descending:
+            rows = rows[::-1]
+        if mask is not None:
+            # keeps the precomputed order, no sorting per filter
+            rows = rows[mask[rows]]
+    return rows[start:stop]
+
+
+@solara.component
+def Table(df, mask=None, items_per_page=20, image_columns: Sequence[str] = ()):
+    """Windowed table, the frame stays on the server and only the visible page is sent.
+
+    Paging and sorting are done here, against the precomputed sort orders.
+    mask is a boolean row filter, image_columns hold image URLs and are not sortable.
+    """
+    options, set_options = solara.use_state({"page": 1, "itemsPerPage": items_per_page, "sortBy": [], "sortDesc": []})
+    total_length = len(df) if mask is None else int(np.count_nonzero(mask))
+    items_per_page = options["itemsPerPage"]
+    if items_per_page <= 0:
+        # "All"
+        items_per_page = max(total_length, 1)
+    # frontend pages are 1 based, stay on the last page when a filter shrinks the frame
+    page = min(options["page"] - 1, max(total_length - 1, 0) // items_per_page)
+    i1 = page * items_per_page
+    i2 = min(total_length, i1 + items_per_page)
+
+    sort_by = options.get("sortBy") or []
+    sort_desc = options.get("sortDesc") or []
+    rows = window(
+        df,
+        mask,
+        sort_by=sort_by[0] if sort_by else None,
+        descending=bool(sort_desc and sort_desc[0]),
+        start=i1,
+        stop=i2,
+    )
+
+    page_rows = df.iloc[rows]
+    # NaN is not valid JSON
+    items = page_rows.astype(object).where(page_rows.notna(), None).to_dict("records")
+    for i, item in enumerate(items):
+        item["__row__"] = i1 + i
+    headers = [{"text": name, "value": name, "sortable": name not in image_columns} for name in df.columns]
+
+    return TableWidget.element(
+        items=items,
+        headers=headers,
+        total_length=total_length,
+        options=options,
+        on_options=set_options,
+        image_slots=[f"item.{name}" for name in image_columns],
+    )
@@ -2,6 +2,7 @@
 https://github.com/widgetti/solara/blob/9dc4e6b282602664a7c73930ee64ddfd714594a5/solara/components/datatable.py
 """
 
+import math
 from typing import List, cast
 
 import numpy as np
@@ -12,57 +13,52 @@ import solara
 from solara.components import ui_checkbox, ui_dropdown
 from solara.hooks import use_cross_filter
 from solara.lab.hooks.dataframe import use_df_column_names
-from solara.lab.utils.dataframe import df_unique
 
+from solarathon.components.table import Table
+from solarathon.registry.bitmap import bitmap_index
 
-cardheight = "100%"
 
-@solara.component
-def Table(df):
-   return solara.DataFrame(
-            df, 
-            # column_actions=column_actions, 
-            # cell_actions=cell_actions
-        )
+cardheight = "100%"
 
 @solara.component
 def TableCard(df):
     filter, set_filter = use_cross_filter(id(df), "table")
-    dff = df
+    mask = None
     filtered = False
     if filter is not None:
         filtered = True
-        dff = df[filter]
+        # the other cards' bitmaps, and-ed
+        mask = bitmap_index(df).mask(filter)
     if filtered:
         title = "Filtered"
     else:
         title = "Showing all"
     title = "Get familiar with Cardano Token Registry"
-    progress = len(dff) / len(df) * 100
+    count = len(df) if mask is None else int(np.count_nonzero(mask))
+    progress = count / len(df) * 100
     with v.Card(elevation=2, height=cardheight) as main:
         with v.CardTitle(children=[title]):
             if filtered:
                 v.ProgressLinear(value=progress)
         with v.CardText():
-            Table(dff)
+            Table(df, mask, image_columns=["icon"])
     return main
 
-
 cardheight = "100%"
 
 @solara.component
 def SummaryCard(df):
     filter, set_filter = use_cross_filter(id(df), "table")
-    dff = df
+    count = len(df)
     filtered = False
     if filter is not None:
         filtered = True
-        dff = df[filter]
+        count = bitmap_index(df).count(filter)
     if filtered:
         title = "Filtered"
     else:
         title = "Showing all"
-    progress = len(dff) / len(df) * 100
+    progress = count / len(df) * 100
     with v.Card(elevation=2, height=cardheight) as main:
         with v.CardTitle(children=[title]):
             if filtered:
@@ -71,9 +67,9 @@ def SummaryCard(df):
             icon = "mdi-filter"
             v.Icon(children=[icon], style_="opacity: 0.1" if not filtered else "")
             if filtered:
-                summary = f"{len(dff):,} / {len(df):,}"
+                summary = f"{count:,} / {len(df):,}"
             else:
-                summary = f"{len(dff):,}"
+                summary = f"{count:,}"
             v.Html(tag="h3", children=[summary], style_="display: inline")
     return main
 
@@ -84,7 +80,10 @@ def DropdownCard(df, column=None):
     filter, set_filter = use_cross_filter(id(df), "filter-dropdown")
     columns = use_df_column_names(df)
     column, set_column = solara.use_state(columns[4] if column is None else column)
-    uniques = df_unique(df, column, limit=max_unique + 1)
+    # dictionary encoded once per frame, uniques and counts come for free
+    index = bitmap_index(df).column(column)
+    uniques = index.uniques(limit=max_unique + 1)
+    counts = index.value_counts()
     value, set_value = solara.use_state(None)
     # to avoid confusing vuetify about selecting 'None' and nothing
     magic_value_missing = "__missing_value__"
@@ -96,10 +95,9 @@ def DropdownCard(df, column=None):
         else:
             value = value["value"]
             if value == magic_value_missing:
-                set_filter(str(df[column].ismissing()))
-            else:
-                filter = df[column] == value
-                set_filter(filter)
+                value = None
+            # cached bitmap of the rows with this value
+            set_filter(index.bitmap(value))
 
     with v.Card(elevation=2, height=cardheight) as main:
         with v.CardTitle(children=["Filter out list"]):
@@ -114,10 +112,54 @@ def DropdownCard(df, column=None):
                             with v.Col():
                                 v.Select(v_model=column, items=columns, on_v_model=set_column, label="Choose column")
             # we use objects to we can distinguish between selecting nothing or None
-            items = [{"value": magic_value_missing if k is None else k, "text": str(k)} for k in uniques]
+            items = [{"value": magic_value_missing if k is None else k, "text": f"{k} ({counts[k]:,})"} for k in uniques]
 
             v.Select(v_model=value, items=items, on_v_model=set_value_and_filter, label=f"Choose {column} value", clearable=True, return_object=True)
             if len(uniques) > max_unique:
                 v.Alert(type="warning", text=True, prominent=True, icon="mdi-alert", children=[f"Too many unique values, will only show first {max_unique}"])
 
-    return main
\ No newline at end of file
+    return main
+
+@solara.component
+def SearchCard(df, index, page_size=10):
+    """Ranked, typo tolerant search, matches also filter the other cards."""
+    query, set_query = solara.use_state("")
+    page, set_page = solara.use_state(0)
+    filter, set_filter = use_cross_filter(id(df), "search")
+    total, rows = index.page(query, page, page_size)
+
+    def set_query_and_filter(value):
+        value = value or ""
+        set_query(value)
+        set_page(0)
+        if not value.strip():
+            set_filter(None)
+        else:
+            set_filter(bitmap_index(df).rows(index.search(value)))
+
+    with v.Card(elevation=2, height=cardheight) as main:
+        with v.CardTitle(children=["Search tokens"]):
+            pass
+        with v.CardText():
+            v.TextField(
+                v_model=query,
+                on_v_model=set_query_and_filter,
+                label="Ticker, name, project or policy ID",
+                prepend_inner_icon="mdi-magnify",
+                clearable=True,
+            )
+            if query.strip():
+                with v.List(dense=True):
+                    for row in df.iloc[rows].to_dict("records"):
+                        with v.ListItem():
+                            with v.ListItemAvatar(size=20):
+                                if row["icon"]:
+                                    v.Img(src=row["icon"])
+                            with v.ListItemContent():
+                                v.ListItemTitle(children=[row["ticker"] or row["policy-token"]])
+                                v.ListItemSubtitle(children=[row["project"] or row["policy-token"]])
+                if total > page_size:
+                    v.Pagination(v_model=page + 1, on_v_model=lambda p: set_page(p - 1), length=math.ceil(total / page_size), total_visible=7)
+                v.Html(tag="div", children=[f"{total:,} matches"], class_="caption")
+
+    return main
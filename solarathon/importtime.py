@@ -0,0 +1,81 @@
+"""Import time budget for the app pages
+
+Solara imports every module in solarathon.pages when the server starts, so
+whatever they import at module level is paid on every cold start, and by every
+new worker when the app scales out. Heavy libraries and data loads belong in
+the code that first needs them (see the Page components).
+
+This check imports the pages in a fresh interpreter with `python -X importtime`,
+after solara itself, and fails when any of the DEFERRED modules got imported or
+when the pages took longer than the budget.
+
+    $ python -m solarathon.importtime [--budget SECONDS]
+"""
+import argparse
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+PAGES = [
+    "solarathon.pages",
+    "solarathon.pages.overview",
+    "solarathon.pages.analyze",
+    "solarathon.pages.screener",
+    "solarathon.pages.backtest",
+    "solarathon.pages.tokenregistry",
+]
+
+# must not be imported until a page renders
+DEFERRED = ["pandas", "yfinance", "mplfinance", "matplotlib", "PIL", "requests", "cryptography"]
+
+BUDGET = 0.25
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure(modules: List[str] = PAGES) -> Tuple[Dict[str, float], List[str]]:
+    """(cumulative seconds per module, every module imported), solara is imported first and not counted."""
+    code = "import solara\n" + "".join(f"import {module}\n" for module in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"importing the pages failed:\n{result.stderr}")
+    imported, cumulative = [], {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match is None:
+            continue
+        name = match.group(4)
+        imported.append(name)
+        # top level entries only, nested ones are part of the cumulative time
+        if len(match.group(3)) == 1 and name in modules:
+            cumulative[name] = int(match.group(2)) / 1e6
+    # the pages are imported after solara, anything below it is ours
+    start = imported.index("solara") + 1 if "solara" in imported else 0
+    return cumulative, imported[start:]
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--budget", type=float, default=BUDGET, help="seconds for importing all pages")
+    args = arg_parser.parse_args(argv)
+
+    cumulative, imported = measure()
+    total = sum(cumulative.values())
+    for module, seconds in cumulative.items():
+        print(f"{module:40} {seconds * 1000:8.1f} ms")
+    print(f"{'total':40} {total * 1000:8.1f} ms (budget {args.budget * 1000:.0f} ms)")
+
+    failed = False
+    heavy = sorted({name for name in imported if name.split(".")[0] in DEFERRED})
+    if heavy:
+        print(f"imported at startup, should be deferred: {', '.join(heavy)}")
+        failed = True
+    if total > args.budget:
+        print("over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+from pathlib import Path
+
+# downloaded market data, kept across restarts
+CACHE_DIR = Path(os.environ.get("SOLARATHON_CACHE_DIR", Path.home() / ".cache" / "solarathon"))
@@ -0,0 +1,186 @@
+"""Backtests of the analyze page's indicators over the stored candles
+
+The EMA and Bollinger Band indicators the chart draws are simulated as trading
+strategies, long or flat, over the daily candles of the OHLCV store:
+
+    - ema_cross: long while the fast EMA is above the slow one
+    - bbands_reversion: buy a close below the lower band, sell above the middle
+    - bbands_breakout: buy a close above the upper band, sell below the middle
+
+The indicators are computed once per distinct parameter (solarathon.market.
+indicators, the same definitions as the chart) and every parameter combination
+of a strategy becomes one row of a (combination x day) position matrix, so
+positions, PnL, equity curves and metrics for a whole grid are a few array
+operations. A position is taken at the close of the day of the signal and
+earns from the next day on, changing it costs `fee` of the equity.
+
+A sweep runs the assets in a process pool, one asset (all strategies and
+grids) per task; the candles are read, and downloaded once for all assets
+when missing, by the calling process.
+"""
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from solarathon.market.indicators import bbands, ema
+from solarathon.market.ohlcv import OHLCVStore, ohlcv_store, utc_today
+from solarathon.util import spawn_pool
+
+# days of history backtested
+HISTORY_DAYS = 5 * 365
+# daily candles, crypto trades every day
+PERIODS_PER_YEAR = 365
+# cost of a trade, as a fraction of the equity
+FEE = 0.001
+
+GRIDS: Dict[str, Dict[str, Sequence]] = {
+    "ema_cross": {"fast": (5, 10, 15, 20, 30), "slow": (20, 30, 50, 100, 200)},
+    "bbands_reversion": {"length": (5, 10, 20, 30), "std": (1.0, 1.5, 2.0, 2.5, 3.0)},
+    "bbands_breakout": {"length": (5, 10, 20, 30), "std": (1.0, 1.5, 2.0, 2.5, 3.0)},
+}
+
+
+def _hold(entries: np.ndarray, exits: np.ndarray) -> np.ndarray:
+    """Positions (0 or 1) per row: in from an entry until the next exit, an entry wins a tie."""
+    signal = np.where(entries, 1.0, np.where(exits, 0.0, np.nan))
+    # forward fill along the days: the index of the last signal so far
+    days = np.arange(signal.shape[1])
+    last = np.maximum.accumulate(np.where(np.isnan(signal), 0, days), axis=1)
+    held = signal[np.arange(len(signal))[:, None], last]
+    return np.nan_to_num(held)
+
+
+def ema_cross(close: np.ndarray, fast: Sequence[int], slow: Sequence[int]) -> Tuple[List[dict], np.ndarray]:
+    """(params, positions) of every fast < slow combination."""
+    emas = {}
+    for length in sorted(set(fast) | set(slow)):
+        out = {"EMA": np.empty(len(close))}
+        ema(close, out, 0, length)
+        emas[length] = out["EMA"]
+    params = [{"fast": f, "slow": s} for f in fast for s in slow if f < s]
+    if not params:
+        return params, np.zeros((0, len(close)))
+    faster = np.stack([emas[p["fast"]] for p in params])
+    slower = np.stack([emas[p["slow"]] for p in params])
+    # NaN before the slow EMA starts compares False, flat
+    return params, (faster > slower).astype(np.float64)
+
+
+def _bands(close: np.ndarray, length: Sequence[int], std: Sequence[float]):
+    params = [{"length": n, "std": k} for n in length for k in std]
+    lower, middle, upper = (np.empty((len(params), len(close))) for _ in range(3))
+    for row, p in enumerate(params):
+        out = {name: np.empty(len(close)) for name in ("BBL", "BBM", "BBU")}
+        bbands(close, out, 0, p["length"], p["std"])
+        lower[row], middle[row], upper[row] = out["BBL"], out["BBM"], out["BBU"]
+    return params, lower, middle, upper
+
+
+def bbands_reversion(close: np.ndarray, length: Sequence[int], std: Sequence[float]) -> Tuple[List[dict], np.ndarray]:
+    params, lower, middle, _ = _bands(close, length, std)
+    return params, _hold(close < lower, close > middle)
+
+
+def bbands_breakout(close: np.ndarray, length: Sequence[int], std: Sequence[float]) -> Tuple[List[dict], np.ndarray]:
+    params, _, middle, upper = _bands(close, length, std)
+    return params, _hold(close > upper, close < middle)
+
+
+STRATEGIES: Dict[str, Callable[..., Tuple[List[dict], np.ndarray]]] = {
+    "ema_cross": ema_cross,
+    "bbands_reversion": bbands_reversion,
+    "bbands_breakout": bbands_breakout,
+}
+
+
+def metrics(close: np.ndarray, positions: np.ndarray, fee: float = FEE) -> Dict[str, np.ndarray]:
+    """Performance of every row of positions (combination x day) over close (2 days or more), one value per row."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns = np.nan_to_num(close[1:] / close[:-1] - 1.0)
+    # yesterday's position earns today's return, a change costs the fee
+    held = positions[:, :-1]
+    trades = np.abs(np.diff(positions, axis=1, prepend=0.0))[:, :-1]
+    pnl = held * returns - trades * fee
+    equity = np.cumprod(1.0 + pnl, axis=1)
+    peak = np.maximum.accumulate(equity, axis=1)
+    deviation = pnl.std(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sharpe = np.where(deviation > 0, pnl.mean(axis=1) / deviation * np.sqrt(PERIODS_PER_YEAR), np.nan)
+    return {
+        "return %": (equity[:, -1] - 1.0) * 100,
+        "sharpe": sharpe,
+        "max drawdown %": (equity / peak - 1.0).min(axis=1) * 100,
+        "trades": (np.diff(positions, axis=1, prepend=0.0) > 0).sum(axis=1),
+        "exposure %": held.mean(axis=1) * 100,
+    }
+
+
+def backtest(ticker: str, close: np.ndarray, grids: Dict[str, Dict[str, Sequence]] = GRIDS, fee: float = FEE) -> pd.DataFrame:
+    """One row per strategy and parameter combination."""
+    if len(close) < 2:
+        return pd.DataFrame()
+    hold_return = (close[-1] / close[0] - 1.0) * 100
+    frames = []
+    for name, grid in grids.items():
+        params, positions = STRATEGIES[name](close, **grid)
+        if not params:
+            continue
+        frame = pd.DataFrame({"ticker": ticker, "strategy": name, "params": [_label(p) for p in params]})
+        for column, values in metrics(close, positions, fee).items():
+            frame[column] = np.round(values, 2)
+        frame["buy & hold %"] = round(hold_return, 2)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _label(params: dict) -> str:
+    return ",".join(f"{key}={value}" for key, value in params.items())
+
+
+def _backtest(args) -> pd.DataFrame:
+    # process pool worker
+    return backtest(*args)
+
+
+def closes(tickers: Sequence[str], days: int = HISTORY_DAYS, store: OHLCVStore = ohlcv_store) -> Dict[str, np.ndarray]:
+    """Adjusted closes of the last `days` closed days per ticker, tickers without candles are left out."""
+    end = utc_today()
+    store.warm(tickers, history=timedelta(days=days))
+    out = {}
+    for ticker in tickers:
+        stored = store.window(ticker, end - timedelta(days=days), end, fetch=False)
+        if stored is None:
+            continue
+        candles, window = stored
+        close = candles["adj_close"][window]
+        if len(close) >= 2:
+            out[ticker] = np.ascontiguousarray(close)
+    return out
+
+
+def sweep(
+    tickers: Sequence[str],
+    grids: Dict[str, Dict[str, Sequence]] = GRIDS,
+    days: int = HISTORY_DAYS,
+    fee: float = FEE,
+    store: OHLCVStore = ohlcv_store,
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """Backtest every grid on every ticker, the assets in parallel."""
+    series = closes(tickers, days, store)
+    tasks = [(ticker, close, grids, fee) for ticker, close in series.items()]
+    if not tasks:
+        return pd.DataFrame()
+    with spawn_pool(max_workers) as executor:
+        frames = list(executor.map(_backtest, tasks))
+    return pd.concat(frames, ignore_index=True)
+
+
+def best(results: pd.DataFrame, by: str = "sharpe") -> pd.DataFrame:
+    """The best combination of every strategy per ticker."""
+    if results.empty:
+        return results
+    ranked = results.sort_values(by, ascending=False, na_position="last")
+    return ranked.drop_duplicates(["ticker", "strategy"]).sort_values(["ticker", "strategy"]).reset_index(drop=True)
@@ -0,0 +1,104 @@
+"""Binance 24hr tickers, batched over a pooled connection
+
+Every card used to fetch its symbol on a new connection, without a timeout.
+The client here keeps one requests Session (keep-alive, a small connection pool,
+bounded retries with backoff) and asks /ticker/24hr for many symbols at once
+with its `symbols=[...]` parameter, so a refresh of every card is a single
+request on an open connection, parsed in one go by pydantic.
+
+Binance answers a batch containing an unknown symbol with 400 and nothing
+else; the batch is then asked again symbol by symbol, and the unknown ones are
+left out of later batches for INVALID_RETRY seconds (a 400 can be transient,
+and a symbol can be listed later).
+
+requests is imported with the first fetch, see solarathon.market.http.
+"""
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+
+from solarathon.market.http import RETRIES, TIMEOUT, pooled_session
+
+BINANCE_API = "https://api.binance.us/api/v3"
+# symbols per request
+BATCH_SIZE = 100
+# seconds before asking again for a symbol Binance did not know
+INVALID_RETRY = 15 * 60
+
+
+class TickerData(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    symbol: str
+    last_price: float = Field(..., alias="lastPrice")
+    price_change_percent: float = Field(..., alias="priceChangePercent")
+    high_price: float = Field(..., alias="highPrice")
+    low_price: float = Field(..., alias="lowPrice")
+
+
+_tickers = TypeAdapter(List[TickerData])
+
+
+def no_data(symbol: str) -> TickerData:
+    """Placeholder of a symbol Binance has no ticker for."""
+    return TickerData(symbol=f"{symbol} no data", last_price=0, price_change_percent=0, high_price=0, low_price=0)
+
+
+class BinanceClient:
+    def __init__(self, api: str = BINANCE_API, timeout=TIMEOUT, retries: int = RETRIES):
+        self.api = api
+        self.timeout = timeout
+        self.retries = retries
+        self._session = None
+        # unknown symbol -> time.monotonic() to ask for it again
+        self._invalid: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                self._session = pooled_session(self.retries)
+            return self._session
+
+    def get(self, path: str, **params):
+        return self.session.get(f"{self.api}/{path}", params=params, timeout=self.timeout)
+
+    def _batch(self, symbols: List[str]) -> Optional[List[TickerData]]:
+        """Tickers of symbols, None when one of them is unknown to Binance."""
+        response = self.get("ticker/24hr", symbols=json.dumps(symbols, separators=(",", ":")))
+        if response.status_code == 400:
+            return None
+        response.raise_for_status()
+        return _tickers.validate_json(response.content)
+
+    def tickers(self, symbols: Sequence[str]) -> Dict[str, TickerData]:
+        """24hr tickers by symbol, in one request per BATCH_SIZE symbols. Unknown symbols get no_data."""
+        wanted = list(dict.fromkeys(symbols))
+        now = time.monotonic()
+        with self._lock:
+            for symbol in [symbol for symbol, retry in self._invalid.items() if retry <= now]:
+                del self._invalid[symbol]
+            valid = [symbol for symbol in wanted if symbol not in self._invalid]
+        found: Dict[str, TickerData] = {}
+        for i in range(0, len(valid), BATCH_SIZE):
+            batch = valid[i : i + BATCH_SIZE]
+            tickers = self._batch(batch)
+            if tickers is None:
+                # find the unknown ones
+                tickers = []
+                for symbol in batch:
+                    single = self._batch([symbol])
+                    if single is None:
+                        with self._lock:
+                            self._invalid[symbol] = time.monotonic() + INVALID_RETRY
+                    else:
+                        tickers.extend(single)
+            found.update((ticker.symbol, ticker) for ticker in tickers)
+        return {symbol: found.get(symbol) or no_data(symbol) for symbol in wanted}
+
+
+binance = BinanceClient()
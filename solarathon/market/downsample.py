@@ -0,0 +1,66 @@
+"""OHLC-aware downsampling of candles for plotting
+
+A chart cannot show more candles than it has pixels across, and mpf.plot takes
+time in proportion to what it is given, so years of daily or months of
+intraday candles are aggregated to at most `max_candles` before plotting:
+
+    - consecutive candles are grouped, a group is the open of its first candle,
+      the highest high, the lowest low, the close of its last candle and the
+      summed volume, so wicks and gaps stay visible
+    - groups are aligned to the positions in the stored series rather than to
+      the plotted range, moving the range keeps the groups in between
+    - indicators are computed on the full resolution candles and sampled at
+      the last candle of each group, returns compound over the group
+
+The stored candles are the cache, zooming in or out aggregates them again.
+"""
+import numpy as np
+
+
+def groups(start: int, stop: int, max_candles: int) -> np.ndarray:
+    """Positions of the first candle of each group in candles[start:stop], at most max_candles groups."""
+    size = max(1, -(-(stop - start) // max_candles))
+    first = -(-start // size) * size
+    starts = np.arange(first, stop, size)
+    if first > start:
+        # the range begins inside a group, the part of it that is plotted
+        starts = np.concatenate([[start], starts])
+    return starts
+
+
+def _ends(starts: np.ndarray, stop: int) -> np.ndarray:
+    """Positions of the last candle of each group."""
+    return np.append(starts[1:], stop) - 1
+
+
+def downsample(candles: np.ndarray, starts: np.ndarray, stop: int) -> np.ndarray:
+    """One candle per group of candles[starts[0]:stop], at the time of its first candle."""
+    if not len(starts):
+        return candles[:0]
+    ends = _ends(starts, stop)
+    offsets = starts - starts[0]
+    window = candles[starts[0]:stop]
+    out = np.empty(len(starts), dtype=candles.dtype)
+    out["time"] = candles["time"][starts]
+    out["open"] = candles["open"][starts]
+    # fmax/fmin skip missing values
+    out["high"] = np.fmax.reduceat(window["high"], offsets)
+    out["low"] = np.fmin.reduceat(window["low"], offsets)
+    out["close"] = candles["close"][ends]
+    out["adj_close"] = candles["adj_close"][ends]
+    out["volume"] = np.add.reduceat(np.nan_to_num(window["volume"]), offsets)
+    return out
+
+
+def sample(values: np.ndarray, starts: np.ndarray, stop: int) -> np.ndarray:
+    """Values at the last candle of each group."""
+    return values[_ends(starts, stop)] if len(starts) else values[:0]
+
+
+def returns(values: np.ndarray, starts: np.ndarray, stop: int) -> np.ndarray:
+    """Return over each group, from the last value before it to its last value."""
+    if not len(starts):
+        return values[:0].astype(np.float64)
+    before = values[np.maximum(starts - 1, 0)].astype(np.float64)
+    before[starts == 0] = np.nan
+    return values[_ends(starts, stop)] / before - 1.0
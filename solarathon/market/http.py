@@ -0,0 +1,29 @@
+"""Pooled HTTP sessions for the market data APIs
+
+A requests Session keeps connections open between requests; the adapter here
+adds a small connection pool and bounded retries with backoff on rate limits
+and server errors. Requests should pass `timeout=TIMEOUT`.
+
+requests is imported when the first session is made.
+"""
+# seconds, (connect, read)
+TIMEOUT = (3.05, 10)
+RETRIES = 2
+
+
+def pooled_session(retries: int = RETRIES):
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=8)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,143 @@
+"""Live market data shared by every session
+
+Each DashboardCard used to poll Binance in its own thread, so N sessions
+showing the 6 default cards made 6 x N identical requests every few seconds.
+The hub runs a single poller for all of them, whatever the number of viewers:
+
+    - `subscribe(symbol, callback)` adds the symbol to the poller (started by
+      the first subscriber) and calls every subscriber with each update
+    - a poll fetches every subscribed symbol at once, see
+      solarathon.market.binance
+    - the returned function unsubscribes, a symbol is dropped with its last
+      subscriber and the poller stops with the last symbol
+    - the last value of a symbol is kept, a new subscriber gets it right away,
+      and a symbol nobody asked for before is fetched right away
+
+Callbacks are made in the solara kernel context of the session that
+subscribed (the poller thread belongs to whichever session started it), so a
+callback can set component state.
+
+Subscriptions holds the subscribers and fans updates out, sources of updates
+extend it: MarketDataHub polls, solarathon.market.stream.TickerStream streams.
+"""
+import contextlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# seconds between updates
+POLL_INTERVAL = 5.0
+
+Callback = Callable[[Any], None]
+# symbols -> value per symbol
+Fetch = Callable[[List[str]], Dict[str, Any]]
+
+
+def _session_context():
+    """The solara kernel context of the caller, if any."""
+    try:
+        from solara.server import kernel_context
+    except ImportError:
+        return contextlib.nullcontext()
+    if kernel_context.has_current_context():
+        return kernel_context.get_current_context()
+    return contextlib.nullcontext()
+
+
+class Subscriptions:
+    def __init__(self):
+        # symbol -> subscription id -> (callback, kernel context)
+        self._subscribers: Dict[str, Dict[int, Tuple[Callback, Any]]] = {}
+        self._latest: Dict[str, Any] = {}
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def latest(self, symbol: str) -> Optional[Any]:
+        return self._latest.get(symbol)
+
+    def symbols(self) -> List[str]:
+        """The symbols subscribed to."""
+        with self._lock:
+            return sorted(self._subscribers)
+
+    def subscribe(self, symbol: str, callback: Callback) -> Callable[[], None]:
+        """Call callback with every update of symbol, until the returned function is called."""
+        with self._lock:
+            self._ids += 1
+            subscription = self._ids
+            subscribers = self._subscribers.setdefault(symbol, {})
+            subscribers[subscription] = (callback, _session_context())
+            latest = self._latest.get(symbol)
+        if latest is not None:
+            callback(latest)
+        self._changed(symbol, latest)
+
+        def unsubscribe():
+            with self._lock:
+                subscribers.pop(subscription, None)
+                if not subscribers and self._subscribers.get(symbol) is subscribers:
+                    del self._subscribers[symbol]
+            self._changed(symbol, latest)
+
+        return unsubscribe
+
+    def _changed(self, symbol: str, latest: Optional[Any]):
+        """Called after a subscription to symbol was added or removed."""
+
+    def publish(self, values: Dict[str, Any]):
+        """Keep the values and pass them to their subscribers."""
+        self._latest.update(values)
+        with self._lock:
+            updates = [
+                (callback, context, values[symbol])
+                for symbol, subscribers in self._subscribers.items()
+                if symbol in values
+                for callback, context in subscribers.values()
+            ]
+        for callback, context, value in updates:
+            try:
+                with context:
+                    callback(value)
+            except Exception as e:
+                print(f"Failed to update a subscriber: {e}")
+
+
+class MarketDataHub(Subscriptions):
+    def __init__(self, fetch: Fetch, interval: float = POLL_INTERVAL):
+        super().__init__()
+        self.fetch = fetch
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+        # set to poll again without waiting for the interval
+        self._wake = threading.Event()
+
+    def running(self) -> bool:
+        with self._lock:
+            return self._thread is not None
+
+    def _changed(self, symbol: str, latest: Optional[Any]):
+        with self._lock:
+            start = self._thread is None and bool(self._subscribers)
+            if start:
+                self._thread = threading.Thread(target=self._run, name="market-data-hub", daemon=True)
+        if start:
+            self._thread.start()
+        elif latest is None or not self._subscribers:
+            # a new symbol is fetched right away, and without symbols the poller stops
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                symbols = sorted(self._subscribers)
+                if not symbols:
+                    self._thread = None
+                    return
+                self._wake.clear()
+            try:
+                values = self.fetch(symbols)
+            except Exception as e:
+                # network hiccups, the next round tries again
+                print(f"Failed to fetch {len(symbols)} symbols: {e}")
+            else:
+                self.publish(values)
+            self._wake.wait(self.interval)
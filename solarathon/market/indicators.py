@@ -0,0 +1,127 @@
+"""Technical indicators over stored candles, computed incrementally
+
+plotTA used to run pandas_ta over a fresh frame on every render. Indicators
+are now computed on the contiguous arrays of the OHLCV store and memoized per
+(ticker, interval, indicator, params):
+
+    - every output value only depends on the inputs up to its candle, so when
+      the store gains candles (or the in-progress one is replaced) only the
+      values from the first changed candle on are computed again, from the
+      previous EMA value or the sums over the last window: O(new candles)
+    - a series that changed at the front (older history was fetched) is
+      computed again from scratch
+    - nothing is computed for indicators that are switched off, callers ask
+      for what they plot
+
+Definitions follow pandas_ta: the EMA starts with the SMA of the first
+`length` values, Bollinger Bands are the SMA plus/minus `std` population
+standard deviations.
+"""
+import threading
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+
+def ema(values: np.ndarray, out: Dict[str, np.ndarray], start: int, length: int = 10):
+    ema = out["EMA"]
+    if start < length:
+        ema[: length - 1] = np.nan
+        if len(values) < length:
+            return
+        ema[length - 1] = values[:length].mean()
+        start = length
+    alpha = 2.0 / (length + 1)
+    previous = ema[start - 1]
+    # recursive, a NaN input holds the previous value
+    for i in range(start, len(values)):
+        value = values[i]
+        if value == value:
+            previous = previous + alpha * (value - previous)
+        ema[i] = previous
+
+
+def bbands(values: np.ndarray, out: Dict[str, np.ndarray], start: int, length: int = 5, std: float = 2.0):
+    first = max(start, length - 1)
+    out["BBL"][start:first] = out["BBM"][start:first] = out["BBU"][start:first] = np.nan
+    if first >= len(values):
+        return
+    # window sums from running sums over just the values needed, shifted by the
+    # first one so the squares stay small
+    segment = values[first - length + 1:]
+    segment = segment - segment[0]
+    sums = np.concatenate([[0.0], np.cumsum(segment)])
+    squares = np.concatenate([[0.0], np.cumsum(segment * segment)])
+    mean = (sums[length:] - sums[:-length]) / length
+    variance = np.maximum((squares[length:] - squares[:-length]) / length - mean * mean, 0.0)
+    deviation = std * np.sqrt(variance)
+    mean = mean + values[first - length + 1]
+    out["BBM"][first:] = mean
+    out["BBL"][first:] = mean - deviation
+    out["BBU"][first:] = mean + deviation
+
+
+def returns(values: np.ndarray, out: Dict[str, np.ndarray], start: int):
+    pct = out["RETURN"]
+    if start == 0:
+        pct[:1] = np.nan
+        start = 1
+    pct[start:] = values[start:] / values[start - 1:-1] - 1.0
+
+
+# name -> (function, output names)
+INDICATORS: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {
+    "ema": (ema, ("EMA",)),
+    "bbands": (bbands, ("BBL", "BBM", "BBU")),
+    "returns": (returns, ("RETURN",)),
+}
+
+
+class _Memo:
+    def __init__(self, candles: np.ndarray, outputs: Dict[str, np.ndarray]):
+        # the candles the outputs were computed from
+        self.candles = candles
+        self.outputs = outputs
+
+
+class IndicatorEngine:
+    def __init__(self):
+        self._memos: Dict[tuple, _Memo] = {}
+        self._lock = threading.Lock()
+
+    def compute(self, ticker: str, interval: str, candles: np.ndarray, name: str, field: str = "close", **params) -> Dict[str, np.ndarray]:
+        """Outputs of an indicator over candles (the full stored series), one value per candle.
+
+        The arrays are shared, treat them as read only.
+        """
+        function, names = INDICATORS[name]
+        key = (ticker, interval, name, field, tuple(sorted(params.items())))
+        with self._lock:
+            memo = self._memos.get(key)
+            if memo is not None and memo.candles is candles:
+                return memo.outputs
+
+            start = 0
+            if memo is not None:
+                # length of the unchanged prefix, the outputs there are still valid
+                n = min(len(memo.candles), len(candles))
+                changed = np.flatnonzero(
+                    (memo.candles["time"][:n] != candles["time"][:n]) | (memo.candles[field][:n] != candles[field][:n])
+                )
+                start = int(changed[0]) if len(changed) else n
+
+            outputs = {}
+            for output in names:
+                array = np.empty(len(candles))
+                if start:
+                    array[:start] = memo.outputs[output][:start]
+                outputs[output] = array
+            values = np.ascontiguousarray(candles[field], dtype=np.float64)
+            function(values, outputs, start, **params)
+            for array in outputs.values():
+                array.setflags(write=False)
+            self._memos[key] = _Memo(candles, outputs)
+            return outputs
+
+
+indicator_engine = IndicatorEngine()
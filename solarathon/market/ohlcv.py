@@ -0,0 +1,310 @@
+"""Local OHLCV store for Yahoo Finance candles
+
+The analyze page used to download the whole history of a ticker on every
+rerender, so moving the days slider or toggling an indicator meant another
+round trip to Yahoo. Candles are now kept per (ticker, interval):
+
+    - on disk as one .npz per key: a structured array of candles sorted by
+      time, plus the [start, end) range that was fetched (which is not the
+      same as the first and last candle, there are no candles before a listing)
+    - in memory once loaded, so a range query is two binary searches and a
+      DataFrame around the slice
+    - a request outside the fetched range only downloads the missing part at
+      either end, and a fetch reaches back at least `prefetch`, so the slider
+      range is covered by the first download
+    - the current, unfinished candle is never marked as fetched, it is
+      downloaded again on the next request that reaches it (nor is a candle
+      that closed but may not be published yet, see CANDLE_LENGTH)
+    - `warm` brings a whole list of tickers up to date with one multi-ticker
+      download, see solarathon.market.warmer
+    - intraday candles only go back so far on Yahoo (MAX_HISTORY), downloads
+      are cut to that, and the range before it counts as fetched
+"""
+import threading
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from solarathon.market import CACHE_DIR
+from solarathon.util import atomic_write
+
+OHLCV_DIR = CACHE_DIR / "ohlcv"
+
+CANDLE = np.dtype(
+    [
+        ("time", "M8[ns]"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("adj_close", "<f8"),
+        ("volume", "<f8"),
+    ]
+)
+# how far back Yahoo serves intraday candles, a little less to be safe
+MAX_HISTORY = {
+    "1m": np.timedelta64(6, "D"),
+    "2m": np.timedelta64(59, "D"),
+    "5m": np.timedelta64(59, "D"),
+    "15m": np.timedelta64(59, "D"),
+    "30m": np.timedelta64(59, "D"),
+    "90m": np.timedelta64(59, "D"),
+    "1h": np.timedelta64(729, "D"),
+    "60m": np.timedelta64(729, "D"),
+}
+# candle length, candles start at multiples of it since the epoch (UTC), as
+# crypto candles do; weekly and monthly candles are not in here
+CANDLE_LENGTH = {
+    "1m": np.timedelta64(1, "m"),
+    "2m": np.timedelta64(2, "m"),
+    "5m": np.timedelta64(5, "m"),
+    "15m": np.timedelta64(15, "m"),
+    "30m": np.timedelta64(30, "m"),
+    "60m": np.timedelta64(60, "m"),
+    "90m": np.timedelta64(90, "m"),
+    "1h": np.timedelta64(1, "h"),
+    "1d": np.timedelta64(1, "D"),
+}
+# candle field -> column name as returned by yf.download
+COLUMNS = {
+    "open": "Open",
+    "high": "High",
+    "low": "Low",
+    "close": "Close",
+    "adj_close": "Adj Close",
+    "volume": "Volume",
+}
+
+Downloader = Callable[[str, datetime, datetime, str], np.ndarray]
+BatchDownloader = Callable[[List[str], datetime, datetime, str], Dict[str, np.ndarray]]
+Time = Union[date, datetime, np.datetime64, str]
+
+
+def _time(value: Time) -> np.datetime64:
+    return np.datetime64(pd.Timestamp(value).tz_localize(None), "ns")
+
+
+def _now() -> np.datetime64:
+    return np.datetime64(datetime.now(timezone.utc).replace(tzinfo=None), "ns")
+
+
+def utc_today() -> date:
+    """The day of the candle in progress, daily candles and the fetched ranges are in UTC."""
+    return datetime.now(timezone.utc).date()
+
+
+def to_candles(df: pd.DataFrame) -> np.ndarray:
+    """Structured candle array from a yf.download frame."""
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.droplevel(list(range(1, df.columns.nlevels)), axis=1)
+    candles = np.empty(len(df), dtype=CANDLE)
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    candles["time"] = index.to_numpy(dtype="M8[ns]")
+    for field, column in COLUMNS.items():
+        values = df[column] if column in df else df["Close"]
+        candles[field] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return candles[np.argsort(candles["time"], kind="stable")]
+
+
+def to_frame(candles: np.ndarray) -> pd.DataFrame:
+    """Frame with the columns and index of yf.download (auto_adjust=False)."""
+    return pd.DataFrame(
+        {column: candles[field] for field, column in COLUMNS.items()},
+        index=pd.DatetimeIndex(candles["time"], name="Date"),
+    )
+
+
+def download_yahoo(ticker: str, start: datetime, end: datetime, interval: str) -> np.ndarray:
+    import yfinance as yf
+
+    df = yf.download(tickers=ticker, start=start, end=end, interval=interval, auto_adjust=False, progress=False)
+    if df is None or df.empty:
+        return np.empty(0, dtype=CANDLE)
+    return to_candles(df)
+
+
+def download_yahoo_many(tickers: List[str], start: datetime, end: datetime, interval: str) -> Dict[str, np.ndarray]:
+    """Candles of several tickers with a single yf.download call."""
+    import yfinance as yf
+
+    df = yf.download(
+        tickers=tickers, start=start, end=end, interval=interval, auto_adjust=False, progress=False, group_by="ticker"
+    )
+    if df is None or df.empty:
+        return {}
+    candles = {}
+    for ticker in tickers:
+        if ticker not in df.columns.get_level_values(0):
+            continue
+        # rows are the union of all tickers' dates
+        frame = df[ticker].dropna(how="all")
+        if not frame.empty:
+            candles[ticker] = to_candles(frame)
+    return candles
+
+
+class _Series:
+    def __init__(self, candles: np.ndarray, start: np.datetime64, end: np.datetime64):
+        self.candles = candles
+        # the fetched range, [start, end)
+        self.start = start
+        self.end = end
+        self.lock = threading.Lock()
+
+
+class OHLCVStore:
+    def __init__(
+        self,
+        directory: Path = OHLCV_DIR,
+        download: Downloader = download_yahoo,
+        download_many: BatchDownloader = download_yahoo_many,
+        prefetch: timedelta = timedelta(days=365),
+    ):
+        self.directory = directory
+        self.download = download
+        self.download_many = download_many
+        self.prefetch = np.timedelta64(prefetch)
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, ticker: str, interval: str) -> Path:
+        return self.directory / f"{ticker}_{interval}.npz"
+
+    def _open(self, ticker: str, interval: str) -> _Series:
+        key = (ticker, interval)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                path = self._path(ticker, interval)
+                if path.exists():
+                    with np.load(path) as stored:
+                        start, end = stored["fetched"]
+                        series = _Series(stored["candles"], start, end)
+                else:
+                    empty = np.datetime64("NaT", "ns")
+                    series = _Series(np.empty(0, dtype=CANDLE), empty, empty)
+                self._series[key] = series
+        return series
+
+    def _save(self, ticker: str, interval: str, series: _Series):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(ticker, interval)
+        with atomic_write(path, "wb") as fw:
+            np.savez(fw, candles=series.candles, fetched=np.array([series.start, series.end]))
+
+    def _fetch(self, ticker: str, interval: str, start: np.datetime64, end: np.datetime64) -> np.ndarray:
+        if interval in MAX_HISTORY:
+            start = max(start, _now() - MAX_HISTORY[interval])
+            if start >= end:
+                return np.empty(0, dtype=CANDLE)
+        candles = self.download(ticker, pd.Timestamp(start).to_pydatetime(), pd.Timestamp(end).to_pydatetime(), interval)
+        return candles[(candles["time"] >= start) & (candles["time"] < end)]
+
+    @staticmethod
+    def _merge(series: _Series, candles: np.ndarray, start: np.datetime64, end: np.datetime64, interval: str):
+        """Store the candles downloaded for [start, end)."""
+        if np.isnat(series.start) or start > series.end or end < series.start:
+            # nothing stored, or a gap to what is stored
+            series.candles, series.start, series.end = candles, start, end
+        else:
+            # stored candles in the range are replaced, the last one may have been in progress
+            stored = series.candles
+            series.candles = np.concatenate([stored[stored["time"] < start], candles, stored[stored["time"] >= end]])
+            series.start, series.end = min(series.start, start), max(series.end, end)
+        # only closed candles are final, the fetched range ends where the candle
+        # in progress (or a closed one not published yet) starts, and the next
+        # request that reaches it downloads it again
+        now = _now()
+        length = CANDLE_LENGTH.get(interval)
+        if length is not None:
+            closed = np.datetime64(0, "ns") + (now - np.datetime64(0, "ns")) // length * length
+        else:
+            closed = min(now, series.candles["time"][-1]) if len(series.candles) else now
+        series.end = max(series.start, min(series.end, closed))
+
+    def _top_up(self, ticker: str, interval: str, series: _Series, start: np.datetime64, end: np.datetime64):
+        """Download whatever of [start, end) is not stored yet."""
+        if np.isnat(series.start):
+            start = min(start, end - self.prefetch)
+            self._merge(series, self._fetch(ticker, interval, start, end), start, end, interval)
+        else:
+            if start < series.start:
+                start = min(start, series.end - self.prefetch)
+                self._merge(series, self._fetch(ticker, interval, start, series.start), start, series.start, interval)
+            if end > series.end:
+                self._merge(series, self._fetch(ticker, interval, series.end, end), series.end, end, interval)
+        self._save(ticker, interval, series)
+
+    def window(self, ticker: str, start: Time, end: Time, interval: str = "1d", fetch: bool = True) -> Optional[Tuple[np.ndarray, slice]]:
+        """(all stored candles, the part of them in [start, end)), downloading what is missing.
+
+        With fetch=False nothing is downloaded and None is returned when the
+        range is not stored. The candle array is replaced, never modified, when
+        the store changes.
+        """
+        start, end = _time(start), _time(end)
+        series = self._open(ticker, interval)
+        with series.lock:
+            if np.isnat(series.start) or start < series.start or end > series.end:
+                if not fetch:
+                    return None
+                self._top_up(ticker, interval, series, start, end)
+            candles = series.candles
+        lo, hi = np.searchsorted(candles["time"], [start, end], side="left")
+        return candles, slice(int(lo), int(hi))
+
+    def get(self, ticker: str, start: Time, end: Time, interval: str = "1d") -> pd.DataFrame:
+        """Candles in [start, end), like yf.download(ticker, start, end, interval=interval, auto_adjust=False)."""
+        candles, window = self.window(ticker, start, end, interval)
+        return to_frame(candles[window])
+
+    def warm(self, tickers: Sequence[str], interval: str = "1d", history: Optional[timedelta] = None) -> List[str]:
+        """Bring the last `history` (`prefetch` by default, and a day) of every ticker up to date, in one download.
+
+        Only tickers missing part of that range or the last closed day are
+        downloaded, from the earliest candle one of them is missing, returns them.
+        """
+        history = self.prefetch if history is None else np.timedelta64(history)
+        today = _now().astype("M8[D]").astype("M8[ns]")
+        start, end = today - history - np.timedelta64(1, "D"), _now()
+        stale, fetch_start = [], end
+        for ticker in tickers:
+            series = self._open(ticker, interval)
+            with series.lock:
+                if np.isnat(series.start) or series.start > start:
+                    stale.append(ticker)
+                    fetch_start = start
+                elif series.end < today:
+                    # only the days since the last closed candle stored
+                    stale.append(ticker)
+                    fetch_start = min(fetch_start, series.end)
+        if not stale:
+            return []
+
+        downloaded = self.download_many(stale, pd.Timestamp(fetch_start).to_pydatetime(), pd.Timestamp(end).to_pydatetime(), interval)
+        for ticker in stale:
+            candles = downloaded.get(ticker, np.empty(0, dtype=CANDLE))
+            candles = candles[(candles["time"] >= fetch_start) & (candles["time"] < end)]
+            series = self._open(ticker, interval)
+            with series.lock:
+                # ends at the last closed candle, see _merge
+                self._merge(series, candles, fetch_start, end, interval)
+                self._save(ticker, interval, series)
+        return stale
+
+    def clear(self, ticker: Optional[str] = None):
+        """Forget stored candles, of one ticker or all of them."""
+        with self._lock:
+            for key in [key for key in self._series if ticker in (None, key[0])]:
+                del self._series[key]
+            if self.directory.exists():
+                for path in self.directory.glob(f"{ticker or '*'}_*.npz"):
+                    path.unlink()
+
+
+ohlcv_store = OHLCVStore()
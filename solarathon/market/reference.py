@@ -0,0 +1,182 @@
+"""Reference data shared by every session: CoinGecko markets, Binance exchangeInfo
+
+Every overview page polled CoinGecko's markets every 30 seconds, and every
+session downloaded Binance's multi-megabyte exchangeInfo to list the base
+assets. A CachedResource fetches an endpoint for all sessions:
+
+    - a value is fresh for the response's Cache-Control max-age, or `ttl`
+      without one, and is served without a request meanwhile
+    - a stale value is served right away while one background request
+      revalidates it, with If-None-Match/If-Modified-Since, so an unchanged
+      payload is a 304 without a body
+    - the last good value is written to CACHE_DIR/reference, a restarted
+      server renders from it before upstream answers, and keeps serving it
+      when upstream fails (asking again every RETRY_DELAY seconds)
+    - without any value, a failed request is not made again for RETRY_DELAY
+      seconds either, meanwhile get() raises right away
+    - what is kept is the payload after `transform`, for exchangeInfo the few
+      fields of every symbol that are used instead of the whole document
+
+Only a cold start without a stored value waits for the request.
+"""
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from solarathon.market import CACHE_DIR
+from solarathon.market.http import TIMEOUT, pooled_session
+from solarathon.util import atomic_write
+
+REFERENCE_DIR = CACHE_DIR / "reference"
+# seconds before asking again after a failed revalidation
+RETRY_DELAY = 30
+
+_max_age = re.compile(r"max-age=(\d+)")
+
+
+def _symbols(exchange_info: dict) -> list:
+    """The fields of exchangeInfo's symbols that are used."""
+    return [
+        {key: symbol[key] for key in ("symbol", "baseAsset", "quoteAsset", "status")}
+        for symbol in exchange_info["symbols"]
+    ]
+
+
+class CachedResource:
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        ttl: float,
+        transform: Callable[[Any], Any] = lambda payload: payload,
+        params: Optional[Dict[str, str]] = None,
+        directory: Path = REFERENCE_DIR,
+    ):
+        self.name = name
+        self.url = url
+        self.ttl = ttl
+        self.transform = transform
+        self.params = params
+        self.directory = directory
+        self._session = None
+        # {"value", "expires", "etag", "last_modified"}, None until loaded
+        self._entry: Optional[dict] = None
+        self._loaded = False
+        self._refreshing = False
+        # (time.time(), error) of the last failed request without a value
+        self._failure: Optional[Tuple[float, Exception]] = None
+        self._lock = threading.Lock()
+        # one request at a time
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"{self.name}.json"
+
+    def _current(self) -> Optional[dict]:
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                try:
+                    with open(self.path) as fr:
+                        self._entry = json.load(fr)
+                except (OSError, ValueError):
+                    self._entry = None
+            return self._entry
+
+    def _save(self, entry: dict):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with atomic_write(self.path) as fw:
+            json.dump(entry, fw)
+
+    def get(self) -> Any:
+        """The value, fetched only when there is none yet (raises when that fails, or failed recently)."""
+        entry = self._current()
+        if entry is None:
+            return self.refresh()
+        if time.time() >= entry["expires"]:
+            with self._lock:
+                start = not self._refreshing
+                self._refreshing = True
+            if start:
+                threading.Thread(target=self._revalidate, name=f"reference-{self.name}", daemon=True).start()
+        return entry["value"]
+
+    def _revalidate(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            # the stored value is served until upstream answers again, which
+            # is not asked on every get meanwhile
+            print(f"Failed to refresh {self.name}: {e}")
+            with self._lock:
+                if self._entry is not None:
+                    self._entry = dict(self._entry, expires=time.time() + min(self.ttl, RETRY_DELAY))
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def refresh(self) -> Any:
+        """Revalidate or fetch the value now, unless it is fresh.
+
+        Without a value, and within RETRY_DELAY of a failed fetch, raises
+        ConnectionError without asking upstream.
+        """
+        with self._refresh_lock:
+            entry = self._current()
+            if entry is not None and time.time() < entry["expires"]:
+                # refreshed while waiting for the lock
+                return entry["value"]
+            if entry is None:
+                with self._lock:
+                    failure = self._failure
+                if failure is not None and time.time() < failure[0] + RETRY_DELAY:
+                    raise ConnectionError(f"{self.name} is unavailable, asking again in {failure[0] + RETRY_DELAY - time.time():.0f}s: {failure[1]}")
+                try:
+                    return self._request(entry)
+                except Exception as e:
+                    with self._lock:
+                        self._failure = (time.time(), e)
+                    raise
+            return self._request(entry)
+
+    def _request(self, entry: Optional[dict]) -> Any:
+        """Fetch, or revalidate entry, and store the result (called with the refresh lock held)."""
+        if self._session is None:
+            self._session = pooled_session()
+        headers = {}
+        if entry is not None and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry is not None and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        response = self._session.get(self.url, params=self.params, headers=headers, timeout=TIMEOUT)
+        if response.status_code == 304 and entry is not None:
+            entry = dict(entry, expires=self._expires(response))
+        else:
+            response.raise_for_status()
+            entry = {
+                "value": self.transform(response.json()),
+                "expires": self._expires(response),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+        self._save(entry)
+        with self._lock:
+            self._entry = entry
+        return entry["value"]
+
+    def _expires(self, response) -> float:
+        max_age = _max_age.search(response.headers.get("Cache-Control", ""))
+        return time.time() + (int(max_age.group(1)) if max_age else self.ttl)
+
+
+coingecko_markets = CachedResource(
+    "coingecko_markets",
+    "https://api.coingecko.com/api/v3/coins/markets",
+    ttl=60,
+    params={"vs_currency": "usd", "order": "market_cap_desc"},
+)
+binance_symbols = CachedResource("binance_symbols", "https://api.binance.us/api/v3/exchangeInfo", ttl=60 * 60, transform=_symbols)
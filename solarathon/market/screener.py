@@ -0,0 +1,144 @@
+"""Signal screener over many assets at once
+
+The closes of every asset are aligned on a common day axis into one
+(asset x day) array, with NaN where an asset has no candle (e.g. before it was
+listed), and every signal is computed for all assets in one vectorized pass:
+
+    - EMA crossovers: the EMAs are recursive, so that is a loop over days, but
+      each step updates all assets at once
+    - Bollinger breakouts: rolling windows from cumulative sums along the day axis
+    - returns over a few horizons: plain slicing
+
+Candles come from the OHLCV store, which is kept warm in the background (see
+solarathon.market.warmer), so a screen is a batched top-up at most and then a
+few milliseconds of numpy, for hundreds of assets too.
+
+The EMAs here start at an asset's first close rather than at the SMA of the
+first `length` closes like the chart's, so the first few weeks differ slightly.
+"""
+from datetime import timedelta
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from solarathon.market.ohlcv import OHLCVStore, ohlcv_store, utc_today
+
+# days of history the signals are computed from
+HISTORY_DAYS = 180
+# crossovers this recent are reported
+RECENT_CROSS_DAYS = 3
+RETURN_HORIZONS = {"1d": 1, "7d": 7, "30d": 30}
+
+
+def aligned_closes(
+    tickers: Sequence[str], days: int = HISTORY_DAYS, store: OHLCVStore = ohlcv_store
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(days, closes) with closes[asset, day], the last day is the last closed one."""
+    today = utc_today()
+    end = np.datetime64(today, "D")
+    axis = np.arange(end - days, end)
+    closes = np.full((len(tickers), days), np.nan)
+    store.warm(tickers)
+    for row, ticker in enumerate(tickers):
+        stored = store.window(ticker, today - timedelta(days=days), today, fetch=False)
+        if stored is None:
+            continue
+        candles, window = stored
+        candles = candles[window]
+        positions = (candles["time"].astype("M8[D]") - axis[0]).astype(np.int64)
+        keep = (positions >= 0) & (positions < days)
+        closes[row, positions[keep]] = candles["adj_close"][keep]
+    return axis, closes
+
+
+def ema(closes: np.ndarray, length: int) -> np.ndarray:
+    """EMA along the day axis for all assets, NaN until an asset's first close, then NaN closes hold."""
+    alpha = 2.0 / (length + 1)
+    out = np.empty_like(closes)
+    previous = np.full(closes.shape[0], np.nan)
+    for day in range(closes.shape[1]):
+        close = closes[:, day]
+        updated = previous + alpha * (close - previous)
+        previous = np.where(np.isnan(previous), close, np.where(np.isnan(close), previous, updated))
+        out[:, day] = previous
+    return out
+
+
+def bbands(closes: np.ndarray, length: int = 5, std: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(lower, middle, upper) along the day axis, NaN where the window has a missing close."""
+    width = closes.shape[1]
+    lower, middle, upper = (np.full(closes.shape, np.nan) for _ in range(3))
+    if width < length:
+        return lower, middle, upper
+    valid = ~np.isnan(closes)
+    # shifted per asset so the squares stay small, missing closes add nothing
+    # to the sums and are counted separately
+    shift = np.zeros((closes.shape[0], 1))
+    np.copyto(shift[:, 0], closes[np.arange(len(closes)), np.argmax(valid, axis=1)], where=valid.any(axis=1))
+    shifted = np.where(valid, closes - shift, 0.0)
+
+    def window_sums(values):
+        sums = np.concatenate([np.zeros((len(values), 1)), np.cumsum(values, axis=1)], axis=1)
+        return sums[:, length:] - sums[:, :-length]
+
+    full = window_sums(valid.astype(np.float64)) == length
+    mean = window_sums(shifted) / length
+    variance = np.maximum(window_sums(shifted * shifted) / length - mean * mean, 0.0)
+    deviation = std * np.sqrt(variance)
+    mean = np.where(full, mean + shift, np.nan)
+    middle[:, length - 1:] = mean
+    lower[:, length - 1:] = mean - deviation
+    upper[:, length - 1:] = mean + deviation
+    return lower, middle, upper
+
+
+def _last_valid(values: np.ndarray) -> np.ndarray:
+    """Last non-NaN value of every row."""
+    valid = ~np.isnan(values)
+    last = values.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    out = values[np.arange(len(values)), last]
+    out[~valid.any(axis=1)] = np.nan
+    return out
+
+
+def signals(tickers: Sequence[str], closes: np.ndarray) -> pd.DataFrame:
+    """Current signals, one row per asset."""
+    fast, slow = ema(closes, 10), ema(closes, 30)
+    lower, _, upper = bbands(closes)
+    close = _last_valid(closes)
+
+    # crossovers: where the sign of fast - slow flips
+    side = np.sign(fast - slow)
+    known = ~np.isnan(side) & (side != 0)
+    flips = (side[:, 1:] != side[:, :-1]) & known[:, 1:] & known[:, :-1]
+    flipped = flips.any(axis=1)
+    days_since = np.where(flipped, np.argmax(flips[:, ::-1], axis=1), -1)
+    trend = side[:, -1]
+    recent = flipped & (days_since < RECENT_CROSS_DAYS)
+    crossover = np.where(recent & (trend > 0), "golden cross", np.where(recent & (trend < 0), "death cross", ""))
+
+    last_close, last_upper, last_lower = closes[:, -1], upper[:, -1], lower[:, -1]
+    band = np.where(last_close > last_upper, "above upper", np.where(last_close < last_lower, "below lower", ""))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        position = (last_close - last_lower) / (last_upper - last_lower)
+
+    columns = {
+        "ticker": list(tickers),
+        "close": close,
+        "trend": np.where(trend > 0, "up", np.where(trend < 0, "down", "")),
+        "crossover": crossover,
+        "days since cross": days_since,
+        "bollinger": band,
+        "%b": np.round(position, 2),
+    }
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for name, horizon in RETURN_HORIZONS.items():
+            past = closes[:, -1 - horizon] if horizon < closes.shape[1] else np.full(len(closes), np.nan)
+            columns[f"return {name} %"] = np.round((closes[:, -1] / past - 1.0) * 100, 2)
+    return pd.DataFrame(columns)
+
+
+def screen(tickers: Sequence[str], days: int = HISTORY_DAYS, store: OHLCVStore = ohlcv_store) -> pd.DataFrame:
+    _, closes = aligned_closes(tickers, days, store)
+    return signals(tickers, closes)
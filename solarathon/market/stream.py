@@ -0,0 +1,243 @@
+"""Live tickers from the Binance WebSocket stream
+
+Polling every few seconds shows prices that are up to a poll old and asks for
+every symbol whether it changed or not. In streaming mode the overview cards
+are fed from the exchange's 24hr mini ticker stream instead:
+
+    - one asyncio WebSocket connection, in a daemon thread, for all symbols of
+      all sessions, opened with the first subscriber and closed with the last
+    - symbols are (un)subscribed on the open connection as cards come and go,
+      with SUBSCRIBE/UNSUBSCRIBE requests for `<symbol>@miniTicker`
+    - every message becomes a TickerData, kept as the symbol's latest value
+      and passed to its subscribers right away (see solarathon.market.hub)
+    - a dropped connection is opened again, with a growing delay, and every
+      symbol is subscribed again
+
+The mini ticker has no price change percentage, it is computed from the open
+price 24 hours ago, as Binance does.
+
+For development and testing, messages can be recorded from the exchange and
+replayed by a local stand-in server, and the stream pointed at it:
+
+    $ python -m solarathon.market.stream record BTCUSDT ETHUSDT --count 200 --out tickers.jsonl
+    $ python -m solarathon.market.stream replay tickers.jsonl --port 8765
+    $ SOLARATHON_TICKER_STREAM=ws://127.0.0.1:8765 solara run solarathon.pages
+
+websockets is imported when a connection is opened.
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+from typing import Any, List, Optional, Sequence, Set
+
+from solarathon.market.binance import TickerData
+from solarathon.market.hub import Subscriptions
+
+BINANCE_STREAM = os.environ.get("SOLARATHON_TICKER_STREAM", "wss://stream.binance.us:9443/ws")
+# seconds before connecting again, doubled on every failure up to the maximum
+RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 30.0
+
+
+def stream_name(symbol: str) -> str:
+    return f"{symbol.lower()}@miniTicker"
+
+
+def mini_ticker(message: dict) -> TickerData:
+    """TickerData of a 24hrMiniTicker message."""
+    last, open_ = float(message["c"]), float(message["o"])
+    change = round((last - open_) / open_ * 100, 3) if open_ else 0.0
+    return TickerData(
+        symbol=message["s"],
+        last_price=last,
+        price_change_percent=change,
+        high_price=float(message["h"]),
+        low_price=float(message["l"]),
+    )
+
+
+class TickerStream(Subscriptions):
+    def __init__(self, url: str = BINANCE_STREAM):
+        super().__init__()
+        self.url = url
+        # connections opened so far
+        self.connections = 0
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # set in the loop when the symbols changed
+        self._update: Optional[asyncio.Event] = None
+        self._requests = 0
+
+    def running(self) -> bool:
+        with self._lock:
+            return self._thread is not None
+
+    def _changed(self, symbol: str, latest: Optional[Any]):
+        with self._lock:
+            start = self._thread is None and bool(self._subscribers)
+            if start:
+                self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), name="ticker-stream", daemon=True)
+            loop, update = self._loop, self._update
+        if start:
+            self._thread.start()
+        elif loop is not None:
+            try:
+                loop.call_soon_threadsafe(update.set)
+            except RuntimeError:
+                # the loop just stopped, there were no symbols left
+                pass
+
+    async def _run(self):
+        with self._lock:
+            self._loop, self._update = asyncio.get_running_loop(), asyncio.Event()
+        delay = RECONNECT_DELAY
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = self._loop = self._update = None
+                    return
+            connections = self.connections
+            try:
+                await self._connection()
+            except Exception as e:
+                if self.connections > connections:
+                    # it was up, start over with the shortest delay
+                    delay = RECONNECT_DELAY
+                print(f"Ticker stream disconnected, connecting again in {delay:g}s: {e!r}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    async def _connection(self):
+        """Stream until there are no symbols left, raises when the connection is lost."""
+        from websockets.asyncio.client import connect
+
+        async with connect(self.url, open_timeout=10) as websocket:
+            self.connections += 1
+            subscribed: Set[str] = set()
+            receiver = asyncio.create_task(self._receive(websocket))
+            try:
+                while True:
+                    self._update.clear()
+                    wanted = set(self.symbols())
+                    if not wanted:
+                        return
+                    await self._request(websocket, "UNSUBSCRIBE", subscribed - wanted)
+                    await self._request(websocket, "SUBSCRIBE", wanted - subscribed)
+                    subscribed = wanted
+                    updated = asyncio.create_task(self._update.wait())
+                    done, _ = await asyncio.wait({receiver, updated}, return_when=asyncio.FIRST_COMPLETED)
+                    if receiver in done:
+                        updated.cancel()
+                        receiver.result()
+                        raise ConnectionError("closed by the server")
+            finally:
+                receiver.cancel()
+
+    async def _request(self, websocket, method: str, symbols: Set[str]):
+        if symbols:
+            self._requests += 1
+            params = [stream_name(symbol) for symbol in sorted(symbols)]
+            await websocket.send(json.dumps({"method": method, "params": params, "id": self._requests}))
+
+    async def _receive(self, websocket):
+        async for raw in websocket:
+            message = json.loads(raw)
+            if isinstance(message, dict) and message.get("e") == "24hrMiniTicker":
+                self.publish({message["s"]: mini_ticker(message)})
+
+
+async def record(symbols: Sequence[str], count: int, url: str = BINANCE_STREAM) -> List[str]:
+    """The next `count` mini ticker messages of symbols, as received."""
+    from websockets.asyncio.client import connect
+
+    messages = []
+    async with connect(url, open_timeout=10) as websocket:
+        await websocket.send(json.dumps({"method": "SUBSCRIBE", "params": [stream_name(s) for s in symbols], "id": 1}))
+        async for raw in websocket:
+            if json.loads(raw).get("e") == "24hrMiniTicker":
+                messages.append(raw)
+                if len(messages) >= count:
+                    return messages
+    return messages
+
+
+async def serve_replay(messages: Sequence[str], host: str = "127.0.0.1", port: int = 0, interval: float = 0.1, repeat: bool = True):
+    """A stand-in for the exchange's stream, sending the recorded messages of the subscribed symbols.
+
+    Answers SUBSCRIBE/UNSUBSCRIBE like the exchange, and sends a message every
+    `interval` seconds (when its symbol is subscribed), from the start again
+    when `repeat`. Returns the websockets server, see its `port` attribute.
+    """
+    from websockets.asyncio.server import serve
+    from websockets.exceptions import ConnectionClosed
+
+    parsed = [(json.loads(raw).get("s", "").lower(), raw) for raw in messages]
+
+    async def handler(websocket):
+        streams: Set[str] = set()
+
+        async def control():
+            async for raw in websocket:
+                request = json.loads(raw)
+                params = {param.lower() for param in request.get("params", [])}
+                if request.get("method") == "SUBSCRIBE":
+                    streams.update(params)
+                elif request.get("method") == "UNSUBSCRIBE":
+                    streams.difference_update(params)
+                await websocket.send(json.dumps({"result": None, "id": request.get("id")}))
+
+        controller = asyncio.create_task(control())
+        try:
+            while not controller.done():
+                for symbol, raw in parsed:
+                    if f"{symbol}@miniticker" in streams:
+                        await websocket.send(raw)
+                    await asyncio.sleep(interval)
+                if not repeat:
+                    break
+                await asyncio.sleep(interval)
+        except ConnectionClosed:
+            pass
+        finally:
+            controller.cancel()
+
+    server = await serve(handler, host, port)
+    server.port = server.sockets[0].getsockname()[1]
+    return server
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m solarathon.market.stream")
+    commands = parser.add_subparsers(dest="command", required=True)
+    recorder = commands.add_parser("record", help="record mini ticker messages from the exchange")
+    recorder.add_argument("symbols", nargs="+")
+    recorder.add_argument("--count", type=int, default=200)
+    recorder.add_argument("--out", default="tickers.jsonl")
+    replayer = commands.add_parser("replay", help="serve recorded messages as a stand-in for the exchange")
+    replayer.add_argument("path")
+    replayer.add_argument("--host", default="127.0.0.1")
+    replayer.add_argument("--port", type=int, default=8765)
+    replayer.add_argument("--interval", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        messages = asyncio.run(record(args.symbols, args.count))
+        with open(args.out, "w") as fw:
+            fw.writelines(message + "\n" for message in messages)
+        print(f"Recorded {len(messages)} messages to {args.out}")
+    else:
+        with open(args.path) as fr:
+            messages = [line.strip() for line in fr if line.strip()]
+
+        async def replay():
+            server = await serve_replay(messages, args.host, args.port, args.interval)
+            print(f"Replaying {len(messages)} messages on ws://{args.host}:{server.port}")
+            await server.serve_forever()
+
+        asyncio.run(replay())
+
+
+if __name__ == "__main__":
+    main()
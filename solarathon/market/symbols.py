@@ -0,0 +1,152 @@
+"""One place that knows what an asset is called by each provider
+
+A base asset ("btc") is BTCUSDT on Binance, a coin id and a market entry on
+CoinGecko and BTC-USD on Yahoo Finance, except where Yahoo appends an id
+because the symbol is taken (TON11419-USD). The registry keeps an index of
+every asset:
+
+    - built in bulk from the cached Binance symbols and CoinGecko markets
+      (solarathon.market.reference), again whenever one of them was refreshed,
+      and swapped in whole, lookups never see half an index
+    - dicts from the base asset and from every provider's identifier, so a
+      lookup is O(1) instead of a scan of the CoinGecko list per card
+    - the assets the analyze page charts (CHARTED) are in it whatever the
+      providers return, with their Yahoo tickers
+
+Yahoo tickers are static and known without any request; an index is only
+built on the first lookup of Binance or CoinGecko data.
+"""
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from solarathon.market.reference import CachedResource, binance_symbols, coingecko_markets
+
+# base assets the analyze page charts, by market cap
+CHARTED = [
+    "btc",
+    "eth",
+    "usdt",
+    "bnb",
+    "xrp",
+    "usdc",
+    "sol",
+    "steth",
+    "ada",
+    "doge",
+    "trx",
+    "wtrx",
+    "ton",
+    "link",
+    "avax",
+    "matic",
+    "dot",
+    "wbtc",
+    "dai",
+    "ltc",
+    "weos",
+    "shib",
+    "bch",
+    "leo",
+    "uni",
+    "okb",
+    "atom",
+    "xlm",
+    "tusd",
+    "xmr",
+]
+# Yahoo Finance tickers that are not "<BASE>-USD"
+YAHOO_TICKERS = {"ton": "TON11419-USD", "uni": "UNI7083-USD"}
+# Binance quote assets, in order of preference
+QUOTES = ("USDT", "USD")
+
+_MISSING: list = []
+
+
+def yahoo_ticker(base: str) -> str:
+    return YAHOO_TICKERS.get(base, f"{base.upper()}-USD")
+
+
+class Asset(NamedTuple):
+    base: str
+    # trading pair, None when Binance does not list the asset
+    binance: Optional[str]
+    # market entry (id, name, image, market cap, ...), None when CoinGecko has none
+    coingecko: Optional[dict]
+    yahoo: str
+
+
+class SymbolIndex:
+    def __init__(self, symbols: List[dict], markets: List[dict]):
+        pairs: Dict[str, Dict[str, str]] = {}
+        for symbol in symbols:
+            if symbol.get("status", "TRADING") == "TRADING":
+                pairs.setdefault(symbol["baseAsset"].lower(), {})[symbol["quoteAsset"]] = symbol["symbol"]
+        coins: Dict[str, dict] = {}
+        for coin in markets:
+            # ordered by market cap, the largest coin keeps a shared symbol
+            coins.setdefault(coin.get("symbol", "").lower(), coin)
+
+        # base -> quote asset -> trading pair
+        self.pairs = pairs
+        self.assets: Dict[str, Asset] = {}
+        for base in dict.fromkeys([*CHARTED, *pairs, *coins]):
+            quotes = pairs.get(base, {})
+            binance = next((quotes[quote] for quote in QUOTES if quote in quotes), None)
+            self.assets[base] = Asset(base, binance, coins.get(base), yahoo_ticker(base))
+        self.by_binance = {pair: base for base, quotes in pairs.items() for pair in quotes.values()}
+        self.by_coingecko_id = {coin["id"]: base for base, coin in coins.items() if "id" in coin}
+        self.by_yahoo = {asset.yahoo: base for base, asset in self.assets.items()}
+        # bases with a Binance pair, sorted
+        self.binance_bases = sorted(base for base, asset in self.assets.items() if asset.binance)
+
+    def get(self, base: str) -> Optional[Asset]:
+        return self.assets.get(base.lower())
+
+    def coingecko(self, base: str) -> Optional[dict]:
+        asset = self.assets.get(base.lower())
+        return asset.coingecko if asset is not None else None
+
+    def binance(self, base: str, quote: str = QUOTES[0]) -> str:
+        """The Binance pair of base against quote, the preferred listed pair when
+        there is none, BASE + quote when Binance does not list base at all."""
+        quotes = self.pairs.get(base.lower(), {})
+        if quote in quotes:
+            return quotes[quote]
+        asset = self.assets.get(base.lower())
+        return asset.binance if asset is not None and asset.binance else base.upper() + quote
+
+
+class SymbolRegistry:
+    def __init__(self, binance: CachedResource = binance_symbols, coingecko: CachedResource = coingecko_markets):
+        self.binance = binance
+        self.coingecko = coingecko
+        self._index: Optional[SymbolIndex] = None
+        # the provider payloads the index was built from
+        self._sources: Tuple[list, list] = (_MISSING, _MISSING)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _value(resource: CachedResource) -> list:
+        try:
+            value = resource.get()
+        except Exception as e:
+            print(f"No {resource.name} for the symbol index: {e}")
+            return _MISSING
+        return value if isinstance(value, list) else _MISSING
+
+    def index(self) -> SymbolIndex:
+        """The current index, built again when a provider's cached payload changed."""
+        symbols, markets = self._value(self.binance), self._value(self.coingecko)
+        with self._lock:
+            # the cached payloads are replaced, never modified, on refresh
+            if self._index is None or symbols is not self._sources[0] or markets is not self._sources[1]:
+                self._index, self._sources = SymbolIndex(symbols, markets), (symbols, markets)
+            return self._index
+
+    @staticmethod
+    def charted() -> List[str]:
+        """Yahoo tickers of the assets the analyze page charts."""
+        return [yahoo_ticker(base) for base in CHARTED]
+
+
+symbol_registry = SymbolRegistry()
@@ -0,0 +1,40 @@
+"""Background prefetch of candles into the OHLCV store
+
+The analyze page lets users flip through a fixed list of assets. Instead of
+downloading each one while the user waits, a daemon thread keeps all of them
+warm in solarathon.market.ohlcv.ohlcv_store: one multi-ticker download when it
+starts, and again every `interval` seconds for the tickers that gained a day.
+
+Importing this module is cheap, pandas and yfinance are imported by the thread.
+"""
+import threading
+from typing import Dict, Sequence, Tuple
+
+WARM_INTERVAL = 15 * 60
+
+_warmers: Dict[Tuple[str, ...], threading.Event] = {}
+_lock = threading.Lock()
+
+
+def _run(tickers: Tuple[str, ...], interval: float, stop: threading.Event):
+    from solarathon.market.ohlcv import ohlcv_store
+
+    while True:
+        try:
+            ohlcv_store.warm(tickers)
+        except Exception as e:
+            # network hiccups, the next round tries again
+            print(f"Failed to prefetch {len(tickers)} tickers: {e}")
+        if stop.wait(interval):
+            return
+
+
+def start_warmer(tickers: Sequence[str], interval: float = WARM_INTERVAL) -> threading.Event:
+    """Start keeping tickers warm, once per process. Set the returned event to stop."""
+    key = tuple(tickers)
+    with _lock:
+        stop = _warmers.get(key)
+        if stop is None or stop.is_set():
+            stop = _warmers[key] = threading.Event()
+            threading.Thread(target=_run, args=(key, interval, stop), name="ohlcv-warmer", daemon=True).start()
+    return stop
@@ -8,7 +8,7 @@ word_limit = solara.reactive(10)
 
 # in case you want to override the default order of the tabs
 # route_order = ["/", "settings", "chat", "clickbutton", "technicalanaly", "dashboard"]
-route_order = ["/", "overview", "analyze", "tokenregistry"]
+route_order = ["/", "overview", "analyze", "screener", "backtest", "tokenregistry"]
 
 
 @solara.component
@@ -24,6 +24,11 @@ def Page():
 
 @solara.component
 def Layout(children):
+    from solarathon.market.warmer import start_warmer
+    from solarathon.pages.analyze import crypto_list
+
+    # the first visit to any page starts prefetching the analyze page's assets
+    start_warmer(crypto_list)
     # this is the default layout, but you can override it here, for instance some extra padding
     return solara.AppLayout(
         children=children,
@@ -1,50 +1,95 @@
 # import libraries
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from io import BytesIO
+
 import solara
-import yfinance as yf
-import mplfinance as mpf
-import pandas_ta as ta
-from datetime import date, timedelta
+from solara.util import CancelledError
+
+from solarathon.market.symbols import SymbolRegistry
 
 # TODO:
-# add progress bar
 # improve the performance
 # refactoring
 
 
-# plot definition
-def plotTA(ticker, days_range, returns, volume, bbanduplow, bbandmidd, ema10, ema30):
+# candle interval -> (candle length, days range slider min, max)
+INTERVALS = {
+    "1d": (timedelta(days=1), 30, 3650),
+    "1h": (timedelta(hours=1), 1, 365),
+    "15m": (timedelta(minutes=15), 1, 59),
+}
+# candles in a plot at most, about 3 pixels each across the 12 inch figure
+CHART_MAX_CANDLES = 400
+
+
+def chart_range(days_range, interval="1d"):
+    """[start, end) of the chart, up to the last closed candle."""
+    if interval == "1d":
+        today_date = date.today() - timedelta(days=1)
+        return today_date - timedelta(days=days_range), today_date
+    step = INTERVALS[interval][0]
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    # the start of the candle in progress
+    end = datetime.min + (now - datetime.min) // step * step
+    return end - timedelta(days=days_range), end
+
+
+# plot definition, the indicator and volume arguments are booleans
+def plotTA(ticker, days_range, returns, volume, bbanduplow, bbandmidd, ema10, ema30, interval="1d"):
+    # heavy, imported on the first plot instead of when solara loads the pages
+    import mplfinance as mpf
+    import pandas as pd
+
+    from solarathon.market import downsample
+    from solarathon.market.indicators import indicator_engine
+    from solarathon.market.ohlcv import ohlcv_store, to_frame
+
     # set the dates to download the data
-    today_date = date.today() - timedelta(days=1)
-    past_date = today_date - timedelta(days=days_range)
+    past_date, today_date = chart_range(days_range, interval)
     message = ""
 
-    # download data daily candles
+    # download data candles
     try:
-        # Attempt to download the data
-        df = yf.download(tickers=ticker, start=past_date, end=today_date)
+        # Attempt to download the data, only what is not in the local store yet
+        candles, window = ohlcv_store.window(ticker, past_date, today_date, interval)
+        # long ranges are aggregated down to what the chart can show
+        starts = downsample.groups(window.start, window.stop, CHART_MAX_CANDLES)
+        df = to_frame(downsample.downsample(candles, starts, window.stop))
         message = "Download_successful"
 
     except Exception as e:
         # Handle the exception and return the error
-        fig = mpf.plot(ta.DataFrame(), type="candle", style="yahoo", title="Empty Plot")
+        fig = mpf.plot(pd.DataFrame(), type="candle", style="yahoo", title="Empty Plot")
         return fig, e
 
+    def indicator(name, field="adj_close", **params):
+        # computed over all stored candles (memoized, only new candles are
+        # computed), then sampled at the plotted candles
+        outputs = indicator_engine.compute(ticker, interval, candles, name, field, **params)
+        return {key: downsample.sample(values, starts, window.stop) for key, values in outputs.items()}
+
     # Create a list to store plot configurations
     addplots = []
 
     # check the alternatives that has been selected, and add the plot to the list
-    if ema10.value:
+    if ema10:
         # calculate EMA10
-        df["EMA10"] = ta.ema(df["Adj Close"], length=10)
+        df["EMA10"] = indicator("ema", length=10)["EMA"]
         addplots.append(
             mpf.make_addplot(
                 df["EMA10"], color="blue", secondary_y=False, label="EMA10"
             )
         )
 
-    if bbanduplow.value:
+    if bbanduplow or bbandmidd:
         # calculate bbands
-        df.ta.bbands(append=True)
+        bands = indicator("bbands", "close", length=5, std=2.0)
+        df["BBL_5_2.0"], df["BBM_5_2.0"], df["BBU_5_2.0"] = bands["BBL"], bands["BBM"], bands["BBU"]
+
+    if bbanduplow:
         addplots.append(
             mpf.make_addplot(
                 df["BBL_5_2.0"], color="purple", secondary_y=False, label="Low BBand"
@@ -56,27 +101,23 @@ def plotTA(ticker, days_range, returns, volume, bbanduplow, bbandmidd, ema10, em
             )
         )
 
-    if bbandmidd.value:
-        # if not bbands calculation
-        if "BBM_5_2.0" not in df.columns:
-            df.ta.bbands(append=True)
-
+    if bbandmidd:
         addplots.append(
             mpf.make_addplot(
                 df["BBM_5_2.0"], color="orange", secondary_y=False, label="Mid BBand"
             )
         )
 
-    if ema30.value:
+    if ema30:
         # calculate EMA30
-        df["EMA30"] = ta.ema(df["Adj Close"], length=30)
+        df["EMA30"] = indicator("ema", length=30)["EMA"]
         addplots.append(
             mpf.make_addplot(df["EMA30"], color="red", secondary_y=False, label="EMA30")
         )
 
-    if returns.value:
-        # Calculate daily returns
-        df["return"] = df["Adj Close"].pct_change()
+    if returns:
+        # Calculate returns, over each plotted candle
+        df["return"] = downsample.returns(candles["adj_close"], starts, window.stop)
 
         addplots.append(
             mpf.make_addplot(
@@ -98,10 +139,10 @@ def plotTA(ticker, days_range, returns, volume, bbanduplow, bbandmidd, ema10, em
     # Create a subplot to display the candlestick chart and add indicators
     fig, axes = mpf.plot(
         df,
-        volume=volume.value,
+        volume=volume,
         type="candle",
         style=style,
-        title=f"Candlestick and TA - {ticker}",
+        title=f"Candlestick and TA - {ticker} {interval}",
         ylabel="Price",
         addplot=addplots,
         figsize=(12, 8),
@@ -111,39 +152,104 @@ def plotTA(ticker, days_range, returns, volume, bbanduplow, bbandmidd, ema10, em
     return fig, message
 
 
-# Crypto ticker list from yahoo finance
-crypto_list = [
-    "BTC-USD",
-    "ETH-USD",
-    "USDT-USD",
-    "BNB-USD",
-    "XRP-USD",
-    "USDC-USD",
-    "SOL-USD",
-    "STETH-USD",
-    "ADA-USD",
-    "DOGE-USD",
-    "TRX-USD",
-    "WTRX-USD",
-    "TON11419-USD",
-    "LINK-USD",
-    "AVAX-USD",
-    "MATIC-USD",
-    "DOT-USD",
-    "WBTC-USD",
-    "DAI-USD",
-    "LTC-USD",
-    "WEOS-USD",
-    "SHIB-USD",
-    "BCH-USD",
-    "LEO-USD",
-    "UNI7083-USD",
-    "OKB-USD",
-    "ATOM-USD",
-    "XLM-USD",
-    "TUSD-USD",
-    "XMR-USD",
-]
+# rendered charts as PNG, (ticker, days range, interval, flags, data version) -> bytes
+CHART_CACHE_SIZE = 64
+# slider and checkbox changes within this many seconds are rendered once
+DEBOUNCE = 0.3
+_charts: "OrderedDict[tuple, bytes]" = OrderedDict()
+_charts_lock = threading.Lock()
+# pyplot is not thread safe, charts are rendered one at a time
+_render_lock = threading.Lock()
+
+
+def chart_key(ticker, days_range, interval, flags, fetch=True):
+    """Cache key of a chart, None when fetch=False and the data is not stored yet."""
+    from solarathon.market.ohlcv import ohlcv_store
+
+    past_date, today_date = chart_range(days_range, interval)
+    stored = ohlcv_store.window(ticker, past_date, today_date, interval, fetch=fetch)
+    if stored is None:
+        return None
+    candles, window = stored
+    # indicators depend on the candles before the range too
+    version = hashlib.blake2b(candles[: window.stop].tobytes(), digest_size=16).hexdigest()
+    return (ticker, days_range, interval, *flags, version)
+
+
+def cached_chart(ticker, days_range, interval, flags):
+    """The chart if it was rendered before, without downloading or plotting (safe in render)."""
+    key = chart_key(ticker, days_range, interval, flags, fetch=False)
+    with _charts_lock:
+        return _charts.get(key) if key is not None else None
+
+
+def render_chart(ticker, days_range, interval, flags, cancel: threading.Event) -> bytes:
+    """plotTA as PNG, cached. Gives up (CancelledError) when cancel is set before plotting."""
+    import matplotlib.pyplot as plt
+
+    key = chart_key(ticker, days_range, interval, flags)
+    with _charts_lock:
+        png = _charts.get(key)
+        if png is not None:
+            _charts.move_to_end(key)
+            return png
+    with _render_lock:
+        if cancel.is_set():
+            raise CancelledError()
+        fig, message = plotTA(ticker, days_range, *flags, interval=interval)
+        if not isinstance(fig, plt.Figure):
+            raise RuntimeError(message)
+        buffered = BytesIO()
+        fig.savefig(buffered, format="png")
+        plt.close(fig)
+    png = buffered.getvalue()
+    with _charts_lock:
+        _charts[key] = png
+        if len(_charts) > CHART_CACHE_SIZE:
+            _charts.popitem(last=False)
+    return png
+
+
+def chart_series(ticker, interval="1d"):
+    """(times, columns, values) buffers of the candles and all indicators, for OHLCChartWidget.
+
+    All of the slider's range is sent, the slider only moves the view and the
+    browser aggregates what is in view to its width.
+    """
+    from solarathon.components.chart_components import chart_buffers
+    from solarathon.market.indicators import indicator_engine
+    from solarathon.market.ohlcv import ohlcv_store
+
+    past_date, today_date = chart_range(INTERVALS[interval][2], interval)
+    candles, window = ohlcv_store.window(ticker, past_date, today_date, interval)
+
+    def indicator(name, field="adj_close", **params):
+        outputs = indicator_engine.compute(ticker, interval, candles, name, field, **params)
+        return {key: values[window] for key, values in outputs.items()}
+
+    bands = indicator("bbands", "close", length=5, std=2.0)
+    plotted = candles[window]
+    return chart_buffers(
+        plotted["time"],
+        {
+            "open": plotted["open"],
+            "high": plotted["high"],
+            "low": plotted["low"],
+            "close": plotted["close"],
+            "volume": plotted["volume"],
+            "EMA10": indicator("ema", length=10)["EMA"],
+            "EMA30": indicator("ema", length=30)["EMA"],
+            "BBL": bands["BBL"],
+            "BBM": bands["BBM"],
+            "BBU": bands["BBU"],
+            "RETURN": indicator("returns")["RETURN"],
+        },
+    )
+
+
+# Crypto ticker list from yahoo finance, shared with the other pages through
+# the symbol registry
+crypto_list = SymbolRegistry.charted()
 
 # Initialization default ticker
 
@@ -155,10 +261,95 @@ bbandmidd = solara.reactive(True)
 ema10 = solara.reactive(True)
 ema30 = solara.reactive(True)
 days_range = solara.reactive(60)
+interval = solara.reactive("1d")
 returns = solara.reactive(False)
 volume = solara.reactive(False)
+# draw the chart in the browser instead of rendering images on the server
+interactive = solara.reactive(False)
 message = ""
 
+
+@solara.component
+def StatusMessage(error):
+    # Status message for crypto selection
+    if error is None:
+        solara.Success(
+            f"Asset selected: {crypto} Download_successful",
+            text=True,
+            dense=True,
+            outlined=True,
+            icon=True,
+        )
+    else:
+        solara.Error(
+            f"There was an Error {error}",
+            dense=True,
+            text=True,
+            outlined=True,
+            icon=True,
+        )
+
+
+@solara.component
+def StaticChart(ticker, days, interval, flags):
+    # a chart rendered before is shown right away
+    cached = cached_chart(ticker, days, interval, flags)
+
+    def render(cancel: threading.Event):
+        if cached is not None:
+            return cached
+        # coalesce rapid changes, a newer render cancels this one
+        if cancel.wait(DEBOUNCE):
+            raise CancelledError()
+        return render_chart(ticker, days, interval, flags, cancel)
+
+    # rendered in a thread, the previous chart stays up meanwhile
+    result = solara.use_thread(render, dependencies=[ticker, days, interval, *flags], intrusive_cancel=False)
+    chart = cached if cached is not None else result.value
+    solara.ProgressLinear(cached is None and result.state in (solara.ResultState.STARTING, solara.ResultState.WAITING, solara.ResultState.RUNNING))
+    if chart is not None:
+        solara.Image(chart)
+    StatusMessage(result.error)
+
+
+@solara.component
+def InteractiveChart(ticker, days, interval, flags):
+    import numpy as np
+
+    from solarathon.components.chart_components import OHLCChart
+
+    # the data only changes with the asset and interval, everything else is done in the browser
+    result = solara.use_thread(lambda: chart_series(ticker, interval), dependencies=[ticker, interval], intrusive_cancel=False)
+    returns, volume, bbanduplow, bbandmidd, ema10, ema30 = flags
+    visible = [
+        name
+        for name, shown in [
+            ("EMA10", ema10),
+            ("EMA30", ema30),
+            ("BBANDS", bbanduplow),
+            ("BBM", bbandmidd),
+            ("volume", volume),
+            ("returns", returns),
+        ]
+        if shown
+    ]
+    solara.ProgressLinear(result.state in (solara.ResultState.STARTING, solara.ResultState.WAITING, solara.ResultState.RUNNING))
+    if result.value is not None:
+        times, columns, values = result.value
+        # the candles of the last `days` days are in view
+        milliseconds = np.frombuffer(times, dtype=np.float64)
+        view = len(milliseconds) - int(np.searchsorted(milliseconds, milliseconds[-1] - days * 86_400_000, side="right")) if len(milliseconds) else 0
+        OHLCChart(f"Candlestick and TA - {ticker} {interval}", times, columns, values, visible, view)
+    StatusMessage(result.error)
+
+
+def set_interval(value):
+    # keep the days range within what the interval allows
+    _, min_days, max_days = INTERVALS[value]
+    days_range.value = min(max(days_range.value, min_days), max_days)
+    interval.value = value
+
+
 # solara component
 @solara.component
 def Page():
@@ -173,7 +364,9 @@ def Page():
             solara.Select(
                 label="Select Crypto asset:", value=crypto, values=crypto_list
             )
-            solara.SliderInt("Days range", value=days_range, min=30, max=365)
+            _, min_days, max_days = INTERVALS[interval.value]
+            solara.Select(label="Candles:", value=interval.value, values=list(INTERVALS), on_value=set_interval)
+            solara.SliderInt("Days range", value=days_range, min=min_days, max=max_days)
 
             # feature selection
             solara.Checkbox(label="Daily Returns", value=returns)
@@ -182,37 +375,14 @@ def Page():
             solara.Switch(label="Bollinger Middle", value=bbandmidd)
             solara.Switch(label="EMA10", value=ema10)
             solara.Switch(label="EMA30", value=ema30)
+            solara.Switch(label="Interactive chart", value=interactive)
 
     # main function to plot technical indicator, input the component values
-    fig, message = plotTA(
-        crypto.value,
-        days_range.value,
-        returns,
-        volume,
-        bbanduplow,
-        bbandmidd,
-        ema10,
-        ema30,
-    )
-    solara.FigureMatplotlib(fig)
-
-    # Status message for crypto selection
-    if message == "Download_successful":
-        solara.Success(
-            f"Asset selected: {crypto} {message}",
-            text=True,
-            dense=True,
-            outlined=True,
-            icon=True,
-        )
+    flags = (returns.value, volume.value, bbanduplow.value, bbandmidd.value, ema10.value, ema30.value)
+    if interactive.value:
+        InteractiveChart(crypto.value, days_range.value, interval.value, flags)
     else:
-        solara.Error(
-            f"There was an Error {message}",
-            dense=True,
-            text=True,
-            outlined=True,
-            icon=True,
-        )
+        StaticChart(crypto.value, days_range.value, interval.value, flags)
 
 
 # The following line is required only when running the code in a Jupyter notebook
@@ -0,0 +1,46 @@
+"""Backtest
+
+The analyze page's indicators as long/flat strategies over the last years of
+daily candles: a grid of EMA lengths and Bollinger Band widths per strategy,
+for every asset. The best combination per asset and strategy is listed, and
+the whole grid of one asset below it. See solarathon.market.backtest.
+"""
+import solara
+
+from solarathon.pages.analyze import crypto_list
+
+rank_by = solara.reactive("sharpe")
+asset = solara.reactive("BTC-USD")
+
+
+@solara.component
+def Page():
+    from solarathon.components.table import Table
+    from solarathon.market.backtest import best, sweep
+
+    runs, set_runs = solara.use_state(0)
+    # nothing is run until asked, a sweep takes a few seconds
+    result = solara.use_thread(lambda: sweep(crypto_list) if runs else None, dependencies=[runs], intrusive_cancel=False)
+    results = result.value
+    # the same frames across rerenders, Table keeps its sort orders per frame
+    ranked = solara.use_memo(lambda: best(results, rank_by.value) if results is not None else None, dependencies=[id(results), rank_by.value])
+    grid = solara.use_memo(
+        lambda: results[results["ticker"] == asset.value].reset_index(drop=True) if results is not None else None,
+        dependencies=[id(results), asset.value],
+    )
+
+    solara.Markdown(
+        r"""
+    # Indicator backtests - Crypto assets
+    """
+    )
+    with solara.Row():
+        solara.Button("Run backtests", on_click=lambda: set_runs(runs + 1), outlined=True)
+        solara.Select(label="Best by:", value=rank_by, values=["sharpe", "return %", "max drawdown %"])
+    solara.ProgressLinear(result.state in (solara.ResultState.STARTING, solara.ResultState.WAITING, solara.ResultState.RUNNING))
+    if result.error is not None:
+        solara.Error(f"There was an Error {result.error}", dense=True, text=True, outlined=True, icon=True)
+    elif results is not None and not results.empty:
+        Table(ranked, items_per_page=30)
+        solara.Select(label="All combinations of:", value=asset, values=list(results["ticker"].unique()))
+        Table(grid, items_per_page=50)
@@ -11,29 +11,21 @@ TODO:
 #can be added setting for init basket of tickers
 #default_currency can be taken from key qoteAsset from api/v3/exchangeInfo
 """
-import threading
 from threading import Event
 from typing import cast, Optional, Union
 
-import requests
 import solara
 from solara.alias import rv
 
+from solarathon.market.binance import TickerData, binance
+from solarathon.market.hub import MarketDataHub
+from solarathon.market.stream import TickerStream
+from solarathon.market.symbols import SymbolIndex, symbol_registry
+
 
 # root = logging.getLogger()
 # root.setLevel(logging.DEBUG)
 
-# some app state that outlives a single page
-from pydantic import BaseModel, Field
-
-
-class TickerData(BaseModel):
-    symbol: str
-    last_price: float = Field(..., alias="lastPrice")
-    price_change_percent: float = Field(..., alias="priceChangePercent")
-    high_price: float = Field(..., alias="highPrice")
-    low_price: float = Field(..., alias="lowPrice")
-
 
 @solara.component
 def GeckoIcon(name: str, img: str):
@@ -69,20 +61,10 @@ def format_price(price):
     return formatted_price
 
 
-def get_binance_ticket(symbol: str) -> TickerData:
-    binance_url = f"https://api.binance.us/api/v3/ticker/24hr?symbol={symbol}"
-    response = requests.get(binance_url)
-    if response.status_code == 200:
-        return TickerData.model_validate_json(json_data=response.content)
-    else:
-        solara.Error(f"Failed to retrieve data from API: {response.content}")
-        return TickerData(
-            symbol=f"{symbol} no data",
-            last_price="0",
-            price_change_percent="0",
-            high_price="0",
-            low_price="0",
-        )
+# one batched poll for all cards of all sessions
+ticker_hub = MarketDataHub(binance.tickers)
+# or one WebSocket stream, in streaming mode
+ticker_stream = TickerStream()
 
 
 @solara.component
@@ -92,20 +74,13 @@ def DashboardCard(
     market_cap: Optional[str] = None,
     market_cap_change_percentage: Optional[str] = None,
     pending: Optional[bool] = False,
+    streaming: bool = False,
 ):
-    ticker_data, set_ticker_data = solara.use_state(cast(Optional[TickerData], None))
-
-    def fetch_data(event: threading.Event):
-        while True:
-            set_ticker_data(get_binance_ticket(symbol))
-            if event.wait(5):
-                print(f"Stopping {symbol}")
-                return
+    source = ticker_stream if streaming else ticker_hub
+    ticker_data, set_ticker_data = solara.use_state(cast(Optional[TickerData], source.latest(symbol)))
 
-    # run the render loop in a separate thread
-    result: solara.Result[bool] = solara.use_thread(fetch_data, intrusive_cancel=False)
-    if result.error:
-        raise result.error
+    # updates come from the shared poller or stream, unsubscribed when the card goes away
+    solara.use_effect(lambda: source.subscribe(symbol, set_ticker_data), [symbol, streaming])
 
     if not ticker_data:
         with rv.Card(
@@ -211,25 +186,11 @@ def DashboardCard(
         return main
 
 
-def get_available_symbols():
-    symbols_url = "https://api.binance.us/api/v3/exchangeInfo"
-    try:
-        symbols_response = requests.get(symbols_url)
-        symbols_data = symbols_response.json()
-        available_symbols = sorted(
-            list(
-                set([symbol["baseAsset"].lower() for symbol in symbols_data["symbols"]])
-            )
-        )
-    except Exception as e:
-        available_symbols = []
-
-    return available_symbols
-
-
 @solara.component
 def Page():
     init_app_state = solara.use_reactive(["ada", "btc", "bnb", "eth", "doge", "xrp"])
+    # live prices from the exchange's WebSocket stream instead of polling
+    streaming = solara.use_reactive(False)
     default_currency = "USDT"
     default_echange = "Binance"
     grid_layout_initial = [
@@ -239,11 +200,10 @@ def Page():
     ]
     grid_layout, set_grid_layout = solara.use_state(grid_layout_initial)
 
-    # Store in state and make sure it won't be refetched when
-    # component is rerendered.
-    available_symbols, _ = solara.use_state(
-        solara.use_memo(get_available_symbols, dependencies=[])
-    )
+    # built in the fetch thread below, a render never waits for the providers
+    symbols, set_symbols = solara.use_state(cast(Optional[SymbolIndex], None))
+    # the assets Binance lists, charted or not
+    available_symbols = symbols.binance_bases if symbols is not None else []
 
     all_tickers = list(init_app_state.value) + available_symbols
 
@@ -279,15 +239,19 @@ def Page():
                     all_tickers,
                     dense=True,
                 )
+            solara.Switch(label="Live stream", value=streaming)
 
         dashboard_cards = []
         row_widths = [4, 4, 4]
 
         def get_coingecko_data():
-            coingecko_json_url = "https://api.coingecko.com/api/v3/coins/markets?vs_currency=usd&order=market_cap_desc"
+            from solarathon.market.reference import coingecko_markets
 
-            coingecko_response = requests.get(coingecko_json_url)
-            return coingecko_response.json()
+            # shared by all sessions, a request per TTL at most
+            try:
+                return coingecko_markets.get()
+            except Exception as e:
+                return {"status": str(e)}
 
         coingecko_data, set_coingecko_data = solara.use_state(
             cast(Optional[dict], None)
@@ -295,6 +259,8 @@ def Page():
 
         def fetch_data(should_stop: Event):
             while True:
+                # built again only when the cached provider data changed
+                set_symbols(symbol_registry.index())
                 set_coingecko_data(get_coingecko_data())
                 if should_stop.wait(30):
                     return
@@ -306,16 +272,16 @@ def Page():
         if result.error:
             raise result.error
 
-        if not coingecko_data:
+        if not coingecko_data or symbols is None:
             return
 
         if "status" in coingecko_data:
             solara.Error(f"Failed to retrieve data: {coingecko_data}")
         else:
             for i, symbol in enumerate(init_app_state.value):
-                coingecko_data_for_symbol = get_data_for_symbol(symbol, coingecko_data)
+                coingecko_data_for_symbol = symbols.coingecko(symbol)
 
-                binance_symbol = symbol.upper() + default_currency
+                binance_symbol = symbols.binance(symbol, default_currency)
 
                 if coingecko_data_for_symbol:
                     card = DashboardCard(
@@ -323,11 +289,12 @@ def Page():
                         GeckoIcon(binance_symbol, coingecko_data_for_symbol["image"]),
                         coingecko_data_for_symbol["market_cap"],
                         coingecko_data_for_symbol["market_cap_change_percentage_24h"],
+                        streaming=streaming.value,
                     ).key(symbol)
                     dashboard_cards.append(card)
 
                 else:
-                    card = DashboardCard(binance_symbol, binance_symbol).key(symbol)
+                    card = DashboardCard(binance_symbol, binance_symbol, streaming=streaming.value).key(symbol)
                     dashboard_cards.append(card)
 
         solara.use_memo(
@@ -358,9 +325,3 @@ def Page():
 
     return main
 
-
-def get_data_for_symbol(symbol, coingecko_list):
-    for coin in coingecko_list:
-        if coin.get("symbol") == symbol:
-            return coin
-    return None
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""Screener
+
+Current signals of every asset from the analyze page side by side: EMA10/EMA30
+crossovers, Bollinger Band breakouts and returns, in a sortable table.
+Computed for all assets at once, see solarathon.market.screener.
+"""
+import solara
+
+from solarathon.pages.analyze import crypto_list
+
+
+@solara.component
+def Page():
+    from solarathon.components.table import Table
+    from solarathon.market.screener import screen
+
+    refreshed, set_refreshed = solara.use_state(0)
+    result = solara.use_thread(lambda: screen(crypto_list), dependencies=[refreshed], intrusive_cancel=False)
+
+    solara.Markdown(
+        r"""
+    # Signal screener - Crypto assets
+    """
+    )
+    with solara.Row():
+        solara.Button("Refresh", on_click=lambda: set_refreshed(refreshed + 1), outlined=True)
+    solara.ProgressLinear(result.state in (solara.ResultState.STARTING, solara.ResultState.WAITING, solara.ResultState.RUNNING))
+    if result.error is not None:
+        solara.Error(f"There was an Error {result.error}", dense=True, text=True, outlined=True, icon=True)
+    elif result.value is not None:
+        Table(result.value, items_per_page=50)
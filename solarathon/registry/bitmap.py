@@ -0,0 +1,103 @@
+"""Dictionary encoded bitmap indexes over the registry frame
+
+Every column is dictionary encoded once (pd.factorize), which gives the unique
+values and their counts for free. For each value that is filtered on, a packed
+bitmap (1 bit per row) is built once and cached, so a selection is a lookup and
+combining selections over several columns is bitwise and/or on a few hundred
+bytes, instead of comparing every row of the frame again.
+
+The registry cards exchange their cross filters as packed bitmaps too: solara
+combines the filters of the other cards with operator.and_, which on bitmaps is
+a bitwise and, and the table and summary unpack or count the result.
+
+The index is built lazily per column and cached per frame. The registry frame is
+shared by all sessions and replaced when the snapshot changes, so in practice
+this is once per snapshot.
+"""
+import threading
+import weakref
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from solarathon.util import FrameCache
+
+# set bits per byte value
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+class ColumnIndex:
+    def __init__(self, series: pd.Series):
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        self.size = len(series)
+        # -1 is missing
+        self.codes = codes.astype(np.int32)
+        self.values = uniques.tolist()
+        self.code = {value: i for i, value in enumerate(self.values)}
+        self.counts = np.bincount(self.codes[self.codes >= 0], minlength=len(self.values))
+        self.missing = int(np.count_nonzero(self.codes < 0))
+        self._bitmaps: Dict[int, np.ndarray] = {}
+
+    def bitmap(self, value) -> np.ndarray:
+        """Packed bitmap of the rows equal to value, None selects missing values."""
+        code = -1 if value is None else self.code.get(value)
+        if code is None:
+            return np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        bitmap = self._bitmaps.get(code)
+        if bitmap is None:
+            bitmap = np.packbits(self.codes == code)
+            bitmap.setflags(write=False)
+            self._bitmaps[code] = bitmap
+        return bitmap
+
+    def uniques(self, limit: Optional[int] = None) -> List[Any]:
+        """Unique values in order of appearance, with None last if there are missing values."""
+        values = self.values if limit is None else self.values[:limit]
+        if self.missing and (limit is None or len(values) < limit):
+            values = values + [None]
+        return values
+
+    def value_counts(self) -> Dict[Any, int]:
+        counts = dict(zip(self.values, self.counts.tolist()))
+        if self.missing:
+            counts[None] = self.missing
+        return counts
+
+
+class BitmapIndex:
+    def __init__(self, df: pd.DataFrame):
+        self.size = len(df)
+        self._df = weakref.ref(df)
+        self._columns: Dict[str, ColumnIndex] = {}
+        self._lock = threading.Lock()
+
+    def column(self, name: str) -> ColumnIndex:
+        index = self._columns.get(name)
+        if index is None:
+            with self._lock:
+                index = self._columns.get(name)
+                if index is None:
+                    index = self._columns[name] = ColumnIndex(self._df()[name])
+        return index
+
+    def rows(self, positions) -> np.ndarray:
+        """Packed bitmap of the rows at positions."""
+        mask = np.zeros(self.size, dtype=bool)
+        mask[positions] = True
+        return np.packbits(mask)
+
+    def mask(self, bitmap: np.ndarray) -> np.ndarray:
+        """Boolean row mask of a packed bitmap."""
+        return np.unpackbits(bitmap, count=self.size).astype(bool)
+
+    def count(self, bitmap: np.ndarray) -> int:
+        # packbits pads the last byte with zero bits
+        return int(_POPCOUNT[bitmap].sum())
+
+
+_indexes: FrameCache[BitmapIndex] = FrameCache(BitmapIndex)
+
+
+def bitmap_index(df: pd.DataFrame) -> BitmapIndex:
+    return _indexes.get(df)
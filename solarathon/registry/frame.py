@@ -0,0 +1,94 @@
+"""Table of registry tokens as shown on the Token Registry page
+
+Built in two stages so a registry delta only redoes the tokens that changed:
+
+    - token_rows: one row per snapshot token, indexed by subject, with the
+      verified join and all per-token formatting done
+    - finish_frame: dedup, sort and renumber
+
+Both are vectorized pandas, the only per-item Python work is formatting the
+few hundred verified entries once. Match and duplicate counts are aggregated
+in `diagnostics` rather than logged per token.
+"""
+from collections import Counter
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+# aggregated over every build, instead of printing per token
+diagnostics: Counter = Counter()
+
+
+def format_links(links):
+    if links:
+        return '\n'.join(links.values())
+    else:
+        return ""
+
+
+def verified_rows(verified_info: Dict[str, dict]) -> pd.DataFrame:
+    """The verified tokens as a frame keyed by policy ID, formatted for the table."""
+    info = pd.DataFrame.from_dict(verified_info, orient="index").reindex(columns=["project", "categories", "socialLinks"])
+    info["project"] = info["project"].fillna("")
+    info["categories"] = info["categories"].map(lambda x: ', '.join(x) if isinstance(x, list) else "")
+    info["socialLinks"] = info["socialLinks"].map(lambda x: format_links(x) if isinstance(x, dict) else "")
+    return info
+
+
+def token_rows(
+    columns: Dict[str, np.ndarray],
+    matched_keys: Sequence[Optional[str]],
+    verified_info: Dict[str, dict],
+    icon_urls: Sequence[str],
+) -> pd.DataFrame:
+    """One row per snapshot token, indexed by subject, with the verified join done."""
+    subject = pd.Index(columns["subject"].astype(object), name="subject")
+    policy = pd.Series(columns["policy"].astype(object), index=subject)
+    name = pd.Series(columns["name"].astype(object), index=subject)
+    matched = pd.Series(list(matched_keys), index=subject, dtype=object)
+    verified = matched.notna()
+
+    # policy+name keys, tokens without a policy share a prefix
+    token_key = ("non policy-" + name).where(policy == "", policy + "-" + name)
+    # verified tokens show the policy ID instead of the policy script
+    policy_token = token_key.where(~verified, matched + "-" + name)
+
+    info = verified_rows(verified_info).reindex(matched.to_numpy())
+    info.index = subject
+
+    diagnostics.update(tokens=len(subject), matched=int(verified.sum()), unmatched=int((~verified).sum()))
+    return pd.DataFrame(
+        {
+            "token_key": token_key,
+            "policy-token": policy_token,
+            "ticker": columns["ticker"].astype(object),
+            "project": info["project"].fillna(""),
+            "categories": info["categories"].fillna(""),
+            "verified": verified,
+            "signature valid": columns["signature_valid"].astype(bool),
+            "socialLinks": info["socialLinks"].fillna(""),
+            "icon": pd.Series(list(icon_urls), index=subject, dtype=object),
+        },
+        index=subject,
+    )
+
+
+def finish_frame(rows: pd.DataFrame) -> pd.DataFrame:
+    """Page frame from token rows in snapshot order."""
+    df = rows.copy()
+    # position in the snapshot
+    df.insert(0, "index", np.arange(len(rows)))
+    # tokens sharing a policy+name key collapse into one row, the last one wins
+    duplicated = df["token_key"].duplicated(keep="last").to_numpy()
+    diagnostics["duplicate_keys"] += int(duplicated.sum())
+    df = df[~duplicated]
+
+    # here do not work because of the index from table not match to original index
+    df = df.sort_values(by=["verified", "ticker"], ascending=[False, True], kind="stable")
+
+    df = df.reset_index(drop=True).drop(columns=["token_key"])
+    df = df.rename(columns={'verified': 'verified by minswap'})
+    return df
+
@@ -0,0 +1,129 @@
+"""Thumbnail cache for registry token logos
+
+Logos in the registry are base64 images of any size and format. Decoding and
+re-encoding them while rendering the table is far too slow, so we do it once:
+
+    - 20x20 PNG thumbnails are generated in a process pool, each worker reads the
+      logo straight from its mapping file using the span stored in the snapshot
+    - thumbnails are stored content-addressed (sha1 of the source logo) under
+      public/thumbnails, so solara serves them as static files and browsers can
+      cache them forever
+    - index.json maps every subject to its logo sequenceNumber and thumbnail,
+      a thumbnail is only regenerated when the sequenceNumber changes
+
+Build it with:
+    $ python -m solarathon.registry.icons
+"""
+import base64
+import hashlib
+import json
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from solarathon.registry.snapshot import MAPPINGS_DIR, PUBLIC_DIR
+from solarathon.util import atomic_write, spawn_pool
+
+
+THUMBNAIL_SIZE = 20
+THUMBNAILS_DIR = PUBLIC_DIR / "thumbnails"
+# solara serves the public directory of the app under /static/public
+STATIC_URL = "/static/public/thumbnails"
+
+
+def make_thumbnail(source: Tuple[str, int, int]) -> Tuple[str, Optional[bytes]]:
+    """Return (digest of the logo, PNG thumbnail), runs in a worker process."""
+    from PIL import Image
+
+    path, offset, length = source
+    with open(path, "rb") as fr:
+        fr.seek(offset)
+        logo = fr.read(length)
+    digest = hashlib.sha1(logo).hexdigest()
+    try:
+        img = Image.open(BytesIO(base64.b64decode(logo)))
+        img = img.convert("RGBA")
+        img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        buffered = BytesIO()
+        img.save(buffered, format="PNG", optimize=True)
+    except Exception as e:
+        print(f"Failed to process image {path}: {e}")
+        return digest, None
+    return digest, buffered.getvalue()
+
+
+class IconCache:
+    def __init__(self, directory: Path = THUMBNAILS_DIR, mappings_dir: Path = MAPPINGS_DIR):
+        self.directory = directory
+        self.mappings_dir = mappings_dir
+        self.index_path = directory / "index.json"
+        # subject -> {"seq": logo sequenceNumber, "digest": thumbnail name or None}
+        self.index: Dict[str, dict] = {}
+        if self.index_path.exists():
+            with open(self.index_path) as fr:
+                self.index = json.load(fr)
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / f"{digest}.png"
+
+    def update(self, columns: Mapping[str, np.ndarray], max_workers: Optional[int] = None) -> int:
+        """Generate thumbnails for new logos and logos with a new sequenceNumber.
+
+        Needs the mapping files, returns the number of thumbnails generated.
+        """
+        stale = []
+        for subject, offset, length, seq in zip(
+            columns["subject"].tolist(),
+            columns["logo_offset"].tolist(),
+            columns["logo_length"].tolist(),
+            columns["logo_seq"].tolist(),
+        ):
+            if offset < 0:
+                continue
+            entry = self.index.get(subject)
+            if entry is not None and entry["seq"] == seq and (entry["digest"] is None or self._path(entry["digest"]).exists()):
+                continue
+            stale.append((subject, seq, (str(self.mappings_dir / f"{subject}.json"), offset, length)))
+        if not stale:
+            return 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with spawn_pool(max_workers) as executor:
+            thumbnails = executor.map(make_thumbnail, [source for _, _, source in stale], chunksize=16)
+            for (subject, seq, _), (digest, png) in zip(stale, thumbnails):
+                if png is None:
+                    self.index[subject] = {"seq": seq, "digest": None}
+                    continue
+                path = self._path(digest)
+                # content-addressed, an identical logo is already stored
+                if not path.exists():
+                    with atomic_write(path, "wb") as fw:
+                        fw.write(png)
+                self.index[subject] = {"seq": seq, "digest": digest}
+
+        with atomic_write(self.index_path) as fw:
+            json.dump(self.index, fw)
+        return len(stale)
+
+    def digest(self, subject: str, seq: int) -> Optional[str]:
+        entry = self.index.get(subject)
+        if entry is None or entry["seq"] != seq:
+            return None
+        return entry["digest"]
+
+    def url(self, subject: str, seq: int) -> str:
+        """Static URL of the thumbnail, empty when there is none (yet)."""
+        digest = self.digest(subject, seq)
+        return f"{STATIC_URL}/{digest}.png" if digest else ""
+
+
+if __name__ == "__main__":
+    import time
+
+    from solarathon.registry.snapshot import load_snapshot
+
+    start = time.perf_counter()
+    generated = IconCache().update(load_snapshot())
+    print(f"generated {generated} thumbnails in {THUMBNAILS_DIR} in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,86 @@
+"""Partial JSON scanner for registry mapping files
+
+A mapping document is a flat object of properties, most of them small, but the
+`logo` value is a base64 string of up to ~90 KB and every property carries a
+`signatures` array. json.loads would decode all of it into Python objects just
+so we can keep a handful of scalars.
+
+The scanner walks the raw bytes instead and relies on the registry schema: a
+property name only appears as a key of the top-level object (nested objects only
+have sequenceNumber, value, signatures, signature and publicKey keys, and a quote
+inside a string is always escaped). The one exception is the unsigned `tool`
+object, whose description and url keys must be stepped over. It jumps from one wanted property to the next
+with a regex search, steps over strings it does not need with bytes.find (base64
+and hex never contain escapes, so that is one call) and hands only the scalars we
+keep to json.loads. For values we only need to locate, like the logo, the byte
+span is returned instead.
+"""
+import json
+import re
+from functools import lru_cache
+from typing import Iterable, Pattern, Tuple
+
+_SCALAR_END = re.compile(rb"[,}\]\s]")
+_QUOTE_OR_CLOSE = re.compile(rb'["}]')
+
+
+def string_end(buf: bytes, pos: int) -> int:
+    """Index after the closing quote of the string opening at buf[pos]."""
+    end = pos
+    while True:
+        end = buf.find(b'"', end + 1)
+        if end == -1:
+            raise ValueError(f"unterminated string at {pos}")
+        # the quote is escaped if it is preceded by an odd number of backslashes
+        backslashes = 0
+        while buf[end - 1 - backslashes] == 0x5C:
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return end + 1
+
+
+def scalar_end(buf: bytes, pos: int) -> int:
+    """Index after the string, number, bool or null starting at buf[pos]."""
+    if buf[pos] == 0x22:  # "
+        return string_end(buf, pos)
+    match = _SCALAR_END.search(buf, pos)
+    return match.start() if match else len(buf)
+
+
+def flat_object_end(buf: bytes, pos: int) -> int:
+    """Index after the object of scalars opening at buf[pos]."""
+    end = pos + 1
+    while True:
+        match = _QUOTE_OR_CLOSE.search(buf, end)
+        if match is None:
+            raise ValueError(f"unterminated object at {pos}")
+        if buf[match.start()] == 0x7D:  # }
+            return match.end()
+        end = string_end(buf, match.start())
+
+
+def property_pattern(keys: Iterable[str]) -> Pattern[bytes]:
+    """Regex matching `"key":` for any of the given top-level properties.
+
+    match.group(1) is the key, match.end() the start of its value.
+    """
+    return re.compile(rb'"(' + b"|".join(re.escape(k.encode()) for k in keys) + rb')"\s*:\s*')
+
+
+@lru_cache(maxsize=None)
+def _field_pattern(name: str) -> Pattern[bytes]:
+    return re.compile(rb'"' + re.escape(name.encode()) + rb'"\s*:\s*')
+
+
+def field(buf: bytes, pos: int, name: str = "value") -> Tuple[int, int]:
+    """Span of the `name` scalar (by default "value") of the property object opening at buf[pos]."""
+    match = _field_pattern(name).search(buf, pos)
+    if match is None:
+        raise ValueError(f"property at {pos} has no {name}")
+    start = match.end()
+    return start, scalar_end(buf, start)
+
+
+def decode(buf: bytes, start: int, end: int):
+    """Decode just the value in buf[start:end]."""
+    return json.loads(buf[start:end])
@@ -0,0 +1,167 @@
+"""Trigram search over the registry frame
+
+Every frame row is described by a few terms: its ticker, token name and project.
+Terms are lowercased, padded and split into trigrams, and each trigram maps to
+the sorted ids of the terms containing it. A query is scored against all terms
+at once (shared trigrams via np.bincount, Jaccard similarity, bonuses for exact
+and prefix matches), which makes it tolerant to typos, and a row scores as its
+best term times the field weight. Policy ID prefixes are matched separately by
+binary search over the sorted policy IDs.
+
+Indexes are built lazily and cached per frame (once per registry version), and
+recent queries are cached, so paging through results does not search again.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from solarathon.registry.verified import POLICY_ID_LENGTH
+from solarathon.util import FrameCache
+
+
+# field -> weight, a ticker hit ranks above the same hit in a project name
+FIELDS = {"ticker": 1.0, "name": 0.9, "project": 0.8}
+MIN_SCORE = 0.3
+_HEX = re.compile(r"[0-9a-f]{4,56}")
+
+
+def trigrams(text: str) -> List[str]:
+    padded = f"  {text} "
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def _prefix_range(sorted_values: np.ndarray, prefix: str) -> Tuple[int, int]:
+    """[lo, hi) of the values starting with prefix, by binary search."""
+    lo = np.searchsorted(sorted_values, prefix, side="left")
+    hi = np.searchsorted(sorted_values, prefix + "\U0010ffff", side="left")
+    return int(lo), int(hi)
+
+
+class SearchIndex:
+    def __init__(self, fields: Dict[str, Sequence[str]], policies: Sequence[str], cache_size: int = 256):
+        """fields maps a field name to one value per row, policies has one policy ID per row."""
+        self.size = len(policies)
+        term_ids: Dict[str, int] = {}
+        pair_doc, pair_term, pair_weight = [], [], []
+        for field, values in fields.items():
+            weight = FIELDS.get(field, 1.0)
+            for doc, value in enumerate(values):
+                value = value.strip().lower()
+                if not value:
+                    continue
+                term = term_ids.setdefault(value, len(term_ids))
+                pair_doc.append(doc)
+                pair_term.append(term)
+                pair_weight.append(weight)
+
+        # term ids in sorted order, so the terms with a given prefix are a contiguous range
+        sorted_terms = sorted(term_ids)
+        remap = np.zeros(len(sorted_terms), dtype=np.int64)
+        for i, term in enumerate(sorted_terms):
+            remap[term_ids[term]] = i
+        pair_term = remap[np.array(pair_term, dtype=np.int64)] if pair_term else np.empty(0, dtype=np.int64)
+        self.terms = np.array(sorted_terms or [""])
+        postings: Dict[str, List[int]] = {}
+        term_grams = np.zeros(len(self.terms), dtype=np.int32)
+        for i, term in enumerate(sorted_terms):
+            grams = trigrams(term)
+            term_grams[i] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self.term_grams = term_grams
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+        # (doc, term, weight) pairs grouped by doc, to reduce term scores per doc
+        order = np.argsort(np.array(pair_doc, dtype=np.int64), kind="stable")
+        self.pair_doc = np.array(pair_doc, dtype=np.int64)[order]
+        self.pair_term = pair_term[order]
+        self.pair_weight = np.array(pair_weight, dtype=np.float64)[order]
+        self.doc_starts = np.flatnonzero(np.r_[True, self.pair_doc[1:] != self.pair_doc[:-1]]) if len(self.pair_doc) else np.empty(0, dtype=np.int64)
+
+        policies = np.array([p[:POLICY_ID_LENGTH].lower() for p in policies] or [""])
+        self.policy_order = np.argsort(policies, kind="stable")
+        self.sorted_policies = policies[self.policy_order]
+
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def _score(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size)
+        if len(self.pair_doc) == 0:
+            return scores
+        grams = trigrams(query)
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return scores
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.terms))
+        term_scores = shared / (len(grams) + self.term_grams - shared)
+        lo, hi = _prefix_range(self.terms, query)
+        term_scores[lo:hi] += 0.5
+        if lo < hi and self.terms[lo] == query:
+            term_scores[lo] += 1.0
+        pair_scores = term_scores[self.pair_term] * self.pair_weight
+        scores[self.pair_doc[self.doc_starts]] = np.maximum.reduceat(pair_scores, self.doc_starts)
+        return scores
+
+    def _policy_matches(self, query: str) -> np.ndarray:
+        lo, hi = _prefix_range(self.sorted_policies, query)
+        return self.policy_order[lo:hi]
+
+    def search(self, query: str) -> np.ndarray:
+        """Row positions matching query, best match first."""
+        query = query.strip().lower()
+        if not query:
+            return np.empty(0, dtype=np.int64)
+        with self._lock:
+            results = self._cache.get(query)
+            if results is not None:
+                self._cache.move_to_end(query)
+                return results
+
+        scores = self._score(query)
+        if _HEX.fullmatch(query):
+            # a policy ID prefix is as good as an exact ticker
+            scores[self._policy_matches(query)] += 2.0
+        matches = np.flatnonzero(scores >= MIN_SCORE)
+        results = matches[np.argsort(-scores[matches], kind="stable")]
+        results.setflags(write=False)
+
+        with self._lock:
+            self._cache[query] = results
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return results
+
+    def page(self, query: str, page: int, page_size: int = 20) -> Tuple[int, np.ndarray]:
+        """(number of matches, row positions of one page of results)"""
+        results = self.search(query)
+        return len(results), results[page * page_size:(page + 1) * page_size]
+
+
+def _search_index(frame: pd.DataFrame, columns) -> SearchIndex:
+    positions = frame["index"].to_numpy()
+    return SearchIndex(
+        {
+            "ticker": frame["ticker"].tolist(),
+            "name": columns["name"][positions].tolist(),
+            "project": frame["project"].tolist(),
+        },
+        columns["subject"][positions].tolist(),
+    )
+
+
+_indexes: FrameCache[SearchIndex] = FrameCache(_search_index)
+
+
+def search_index(frame: pd.DataFrame, columns) -> SearchIndex:
+    """Search index over the rows of a registry frame.
+
+    columns are the snapshot columns the frame was built from, the frame's
+    "index" column points into them.
+    """
+    return _indexes.get(frame, columns)
@@ -0,0 +1,230 @@
+"""Process-wide token registry shared by all Solara sessions
+
+The registry never changes while the app runs (unless someone replaces the files
+in public/mappings or public/tokens), so there is no reason for every browser tab
+to load its own copy. `registry_service.get()` returns one immutable `Registry`
+for the whole process:
+
+    - concurrent first calls share a single load (single-flight)
+    - every session gets the same objects, nothing is copied per session
+    - the source files are fingerprinted (names, sizes, mtimes) at most every
+      `check_interval` seconds, and a change triggers a refresh
+    - a refresh only re-reads the mapping files that were added, modified or
+      removed and patches the registry, so the registry can be updated by
+      replacing files without restarting workers (see `sync` for known deltas)
+"""
+import threading
+import time
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+from types import MappingProxyType
+from typing import Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from solarathon.registry.frame import finish_frame, token_rows
+from solarathon.registry.icons import THUMBNAILS_DIR, IconCache
+from solarathon.registry.signatures import SignatureCache
+from solarathon.registry.snapshot import (
+    MAPPINGS_DIR,
+    PUBLIC_DIR,
+    SNAPSHOT_PATH,
+    file_stats,
+    load_snapshot,
+    load_token,
+    open_snapshot,
+    signatures_path,
+    source_signature,
+    to_columns,
+    write_snapshot,
+)
+from solarathon.registry.verified import VerifiedIndex
+
+
+TOKENS_PATH = PUBLIC_DIR / "tokens" / "tokens.json"
+
+
+@dataclass(frozen=True)
+class Registry:
+    version: str
+    # read only snapshot columns, sorted by subject
+    columns: Mapping[str, np.ndarray]
+    verified_info: Mapping[str, dict]
+    verified_index: VerifiedIndex
+    # verified key per snapshot row, None when not verified
+    matched_keys: Tuple[Optional[str], ...]
+    icons: IconCache
+    # one formatted row per snapshot row, indexed by subject (see frame.token_rows)
+    rows: pd.DataFrame
+    # shared by all sessions, treat as read only
+    frame: pd.DataFrame
+    # what the registry was built from, to work out deltas
+    mapping_stats: Mapping[str, Tuple[int, int]]
+    tokens_signature: Optional[str]
+
+
+class RegistryService:
+    def __init__(
+        self,
+        mappings_dir: Path = MAPPINGS_DIR,
+        tokens_path: Path = TOKENS_PATH,
+        snapshot_path: Path = SNAPSHOT_PATH,
+        thumbnails_dir: Path = THUMBNAILS_DIR,
+        check_interval: float = 5.0,
+    ):
+        self.mappings_dir = mappings_dir
+        self.tokens_path = tokens_path
+        self.snapshot_path = snapshot_path
+        self.thumbnails_dir = thumbnails_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._registry: Optional[Registry] = None
+        self._pending: Optional[Future] = None
+        self._checked_at = 0.0
+
+    def _signature(self) -> Optional[str]:
+        return source_signature(self.mappings_dir, self.tokens_path, self.snapshot_path, self.thumbnails_dir / "index.json")
+
+    def _load(self) -> Registry:
+        mapping_stats = file_stats(self.mappings_dir)
+        columns = load_snapshot(self.snapshot_path, self.mappings_dir)
+        with open(self.tokens_path) as fr:
+            verified_info = json.load(fr)
+        verified_index = VerifiedIndex(verified_info)
+        matched_keys = tuple(verified_index.match_all(columns["subject"].tolist()))
+        icons = IconCache(self.thumbnails_dir, self.mappings_dir)
+        if self.mappings_dir.exists():
+            # only logos that are new or changed, normally prebuilt with the snapshot
+            icons.update(columns)
+        rows = token_rows(columns, matched_keys, verified_info, self._icon_urls(icons, columns))
+        return Registry(
+            # taken after loading, a rebuilt snapshot is part of this version
+            version=self._signature(),
+            columns=MappingProxyType(columns),
+            verified_info=MappingProxyType(verified_info),
+            verified_index=verified_index,
+            matched_keys=matched_keys,
+            icons=icons,
+            rows=rows,
+            frame=finish_frame(rows),
+            mapping_stats=MappingProxyType(mapping_stats),
+            tokens_signature=source_signature(self.tokens_path),
+        )
+
+    @staticmethod
+    def _icon_urls(icons: IconCache, columns) -> List[str]:
+        return [icons.url(subject, seq) for subject, seq in zip(columns["subject"].tolist(), columns["logo_seq"].tolist())]
+
+    def _patch(self, registry: Registry, changed: List[Path], removed: List[str]) -> Registry:
+        """New registry version with changed (or new) mapping files re-read and removed subjects dropped.
+
+        Parsing, signature checks, the verified join, thumbnails and row
+        formatting are only done for the changed files. The rest is copying arrays and vectorized pandas.
+        """
+        mapping_stats = file_stats(self.mappings_dir)
+        with ThreadPoolExecutor() as executor:
+            tokens = [t for t in executor.map(load_token, changed) if t is not None]
+        SignatureCache(signatures_path(self.snapshot_path)).update(tokens, self.mappings_dir)
+        patch = to_columns(tokens)
+        patch_matched = registry.verified_index.match_all(patch["subject"].tolist())
+        registry.icons.update(patch)
+        patch_rows = token_rows(patch, patch_matched, registry.verified_info, self._icon_urls(registry.icons, patch))
+
+        drop = set(removed) | set(patch["subject"].tolist())
+        keep = ~np.isin(registry.columns["subject"], list(drop))
+        columns = {name: np.concatenate([registry.columns[name][keep], patch[name]]) for name in registry.columns}
+        # keep the snapshot sorted by subject, like a full build
+        order = np.argsort(columns["subject"], kind="stable")
+        columns = {name: column[order] for name, column in columns.items()}
+        matched_keys = np.concatenate([np.array(registry.matched_keys, dtype=object)[keep], np.array(patch_matched, dtype=object)])
+        matched_keys = tuple(matched_keys[order])
+        rows = pd.concat([registry.rows[keep], patch_rows]).iloc[order]
+
+        write_snapshot(columns, self.snapshot_path, source=source_signature(self.mappings_dir))
+        columns = open_snapshot(self.snapshot_path)
+        return replace(
+            registry,
+            version=self._signature(),
+            columns=MappingProxyType(columns),
+            matched_keys=matched_keys,
+            rows=rows,
+            frame=finish_frame(rows),
+            mapping_stats=MappingProxyType(mapping_stats),
+        )
+
+    def _refresh(self, registry: Optional[Registry], delta=None) -> Registry:
+        if registry is None:
+            return self._load()
+        if delta is not None:
+            return self._patch(registry, *delta)
+        mapping_stats = file_stats(self.mappings_dir)
+        if not mapping_stats or source_signature(self.tokens_path) != registry.tokens_signature:
+            # no mappings to diff against, or the verified tokens changed
+            return self._load()
+        changed = [self.mappings_dir / name for name, stat in mapping_stats.items() if registry.mapping_stats.get(name) != stat]
+        removed = [Path(name).stem for name in registry.mapping_stats if name not in mapping_stats]
+        if not changed and not removed:
+            # the snapshot or thumbnails were replaced
+            return self._load()
+        return self._patch(registry, changed, removed)
+
+    def _get(self, force=False, delta=None) -> Registry:
+        while True:
+            with self._lock:
+                registry = self._registry
+                if not force and registry is not None and time.monotonic() - self._checked_at < self.check_interval:
+                    return registry
+                if self._pending is None:
+                    self._checked_at = time.monotonic()
+                    if not force and registry is not None and registry.version == self._signature():
+                        return registry
+                    self._pending = pending = Future()
+                    leader = True
+                else:
+                    pending = self._pending
+                    leader = False
+                    if registry is not None and not force:
+                        # a reload is in progress, keep serving the current version
+                        return registry
+
+            if not leader:
+                result = pending.result()
+                if not force:
+                    return result
+                # our delta still has to be applied on top of that
+                continue
+
+            try:
+                registry = self._refresh(registry, delta)
+            except BaseException as e:
+                with self._lock:
+                    self._pending = None
+                pending.set_exception(e)
+                raise
+            with self._lock:
+                self._registry = registry
+                self._pending = None
+            pending.set_result(registry)
+            return registry
+
+    def get(self) -> Registry:
+        return self._get()
+
+    def sync(self, changed: Iterable[Path] = (), removed: Iterable[str] = ()) -> Registry:
+        """Apply new or modified mapping files and removed subjects to the loaded registry.
+
+        get() finds these deltas on its own from file sizes and mtimes, use this
+        when the changed files are already known (e.g. from a registry pull).
+        """
+        return self._get(force=True, delta=(list(changed), list(removed)))
+
+    def invalidate(self):
+        """Force the next get() to check the source files again."""
+        with self._lock:
+            self._checked_at = 0.0
+
+
+registry_service = RegistryService()
@@ -0,0 +1,147 @@
+"""Ed25519 signature checks for registry mapping files
+
+Every property of a mapping (name, ticker, logo, ...) is signed by the token
+issuer, as specified in CIP-26. A signature covers
+
+    blake2b-256(
+        blake2b-256(cbor(subject)) + blake2b-256(cbor(property name))
+        + blake2b-256(cbor(value)) + blake2b-256(cbor(sequenceNumber))
+    )
+
+where the subject and property name are CBOR text, the value is CBOR text (an
+unsigned integer for decimals, the decoded bytes for the logo) and the
+sequenceNumber an unsigned integer. A token counts as valid when every property
+has at least one good signature, made by a key whose hash appears in the
+token's policy script (when it has one).
+
+Checking means json.loads of the whole file, a base64 decode of the logo and a
+few Ed25519 verifications per token, so it is done at snapshot build time in a
+process pool and the result is stored in the snapshot. signatures.json, next to
+the snapshot, remembers the outcome per subject together with the
+sequenceNumbers of its properties, and as a property's sequenceNumber is bumped
+on every change, a token is only checked again when one of them changed.
+
+Build it with the snapshot:
+    $ python -m solarathon.registry.snapshot
+"""
+import base64
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from solarathon.util import atomic_write, spawn_pool
+
+# properties that are part of the mapping but not signed
+UNSIGNED = ("subject", "policy", "tool")
+
+
+def _head(major: int, n: int) -> bytes:
+    if n < 24:
+        return bytes([major << 5 | n])
+    for info, size in ((24, 1), (25, 2), (26, 4), (27, 8)):
+        if n < 1 << (8 * size):
+            return bytes([major << 5 | info]) + n.to_bytes(size, "big")
+    raise ValueError(f"{n} does not fit in a CBOR head")
+
+
+def _cbor(value) -> bytes:
+    if isinstance(value, bytes):
+        return _head(2, len(value)) + value
+    if isinstance(value, str):
+        encoded = value.encode()
+        return _head(3, len(encoded)) + encoded
+    if isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+        return _head(0, value)
+    raise TypeError(f"cannot encode {type(value).__name__} for a signature")
+
+
+def _hash(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=32).digest()
+
+
+def message(subject: str, name: str, value, sequence_number: int) -> bytes:
+    """The bytes signed for one property of a mapping."""
+    if name == "logo":
+        value = base64.b64decode(value)
+    return _hash(b"".join(_hash(_cbor(v)) for v in (subject, name, value, sequence_number)))
+
+
+def key_hash(public_key: str) -> str:
+    """Hash of a verification key as it appears in policy scripts."""
+    return hashlib.blake2b(bytes.fromhex(public_key), digest_size=28).hexdigest()
+
+
+def check_mapping(mapping: dict) -> bool:
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+
+    subject = mapping.get("subject")
+    policy = (mapping.get("policy") or "").lower()
+    if not subject:
+        return False
+    properties = {name: prop for name, prop in mapping.items() if name not in UNSIGNED and isinstance(prop, dict)}
+    if not properties:
+        return False
+    for name, prop in properties.items():
+        try:
+            signed = message(subject, name, prop["value"], prop["sequenceNumber"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        for signature in prop.get("signatures") or ():
+            try:
+                if policy and key_hash(signature["publicKey"]) not in policy:
+                    continue
+                key = Ed25519PublicKey.from_public_bytes(bytes.fromhex(signature["publicKey"]))
+                key.verify(bytes.fromhex(signature["signature"]), signed)
+            except (KeyError, TypeError, ValueError, InvalidSignature):
+                continue
+            break
+        else:
+            return False
+    return True
+
+
+def check_file(path: str) -> bool:
+    """Whether all properties of a mapping file are properly signed, runs in a worker process."""
+    try:
+        with open(path, "rb") as fr:
+            mapping = json.load(fr)
+    except (OSError, ValueError):
+        return False
+    return isinstance(mapping, dict) and check_mapping(mapping)
+
+
+class SignatureCache:
+    def __init__(self, path: Path):
+        self.path = path
+        # subject -> {"seq": sequence numbers of the properties, "valid": bool}
+        self.results: Dict[str, dict] = {}
+        if self.path.exists():
+            with open(self.path) as fr:
+                self.results = json.load(fr)
+
+    def update(self, tokens: Sequence[dict], mappings_dir: Path, max_workers: Optional[int] = None) -> int:
+        """Set "signature_valid" on the tokens, checking new and changed ones.
+
+        tokens come from snapshot.load_token, returns the number of files checked.
+        """
+        stale: List[dict] = []
+        for token in tokens:
+            entry = self.results.get(token["subject"])
+            if entry is not None and entry["seq"] == token["sequence"]:
+                token["signature_valid"] = int(entry["valid"])
+            else:
+                stale.append(token)
+        if not stale:
+            return 0
+
+        paths = [str(mappings_dir / f"{token['subject']}.json") for token in stale]
+        with spawn_pool(max_workers) as executor:
+            for token, valid in zip(stale, executor.map(check_file, paths, chunksize=32)):
+                token["signature_valid"] = int(valid)
+                self.results[token["subject"]] = {"seq": token["sequence"], "valid": valid}
+
+        with atomic_write(self.path) as fw:
+            json.dump(self.results, fw)
+        return len(stale)
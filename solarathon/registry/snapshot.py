@@ -0,0 +1,252 @@
+"""Columnar snapshot of the Cardano token registry
+
+The raw registry in public/mappings is ~2,250 JSON documents (~97 MB, mostly
+base64 logos and signatures). Parsing it on every page load is far too slow, so
+we compile the few fields the app needs into one binary file once, at build time,
+and memory-map it at runtime.
+
+File layout:
+    magic (8 bytes) | header length (uint32, little endian) | JSON header | columns
+
+Each column is a contiguous numpy array aligned to 64 bytes, described in the
+header by its name, dtype and offset, so it can be opened with np.memmap without
+copying anything.
+
+Build it with:
+    $ python -m solarathon.registry.snapshot
+"""
+import hashlib
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from solarathon.registry import parser
+from solarathon.registry.signatures import SignatureCache
+from solarathon.util import atomic_write
+
+
+PUBLIC_DIR = Path(__file__).parent.parent / "public"
+MAPPINGS_DIR = PUBLIC_DIR / "mappings"
+SNAPSHOT_PATH = Path(__file__).parent / "registry.snapshot"
+
+MAGIC = b"SOLREG01"
+FORMAT_VERSION = 3
+ALIGNMENT = 64
+
+# column name -> fixed dtype, string columns get their width at build time
+COLUMNS = {
+    "subject": "U",
+    "policy": "U",
+    "name": "U",
+    "ticker": "U",
+    "decimals": "<i2",
+    "logo_offset": "<i8",
+    "logo_length": "<i8",
+    "logo_seq": "<i4",
+    # 1 valid, 0 invalid, see solarathon.registry.signatures
+    "signature_valid": "<i1",
+}
+
+
+_PROPERTIES = parser.property_pattern(["subject", "policy", "name", "ticker", "decimals", "logo", "description", "url", "tool"])
+# signed properties we only need the sequenceNumber of
+_SEQUENCE_ONLY = ("description", "url")
+
+
+# Aggregate token metadata from the cardano token registry
+def load_token(path: Path) -> Optional[Dict[str, Union[str, int]]]:
+    """Extract the snapshot fields of one mapping file.
+
+    Only the scalars we keep are decoded, the logo is located but not read and
+    signatures are skipped entirely (see solarathon.registry.parser). "sequence"
+    lists the sequenceNumber of every signed property, it is not a column but
+    tells the signature cache whether the token changed.
+    """
+    raw = path.read_bytes()
+    token = {
+        "subject": "",
+        "policy": "",
+        "name": "",
+        "ticker": "",
+        "decimals": -1,
+        "logo_offset": -1,
+        "logo_length": 0,
+        "logo_seq": -1,
+        "signature_valid": 0,
+    }
+    sequence = {}
+    pos = 0
+    try:
+        while True:
+            match = _PROPERTIES.search(raw, pos)
+            if match is None:
+                break
+            key, start = match.group(1).decode(), match.end()
+            if key == "tool":
+                # not signed, and its description and url are not properties
+                pos = parser.flat_object_end(raw, start)
+                continue
+            if key in ("subject", "policy"):
+                pos = parser.scalar_end(raw, start)
+                token[key] = parser.decode(raw, start, pos) or ""
+                continue
+            # sequenceNumber is bumped whenever the property changes
+            sequence[key] = parser.decode(raw, *parser.field(raw, start, "sequenceNumber"))
+            if key == "logo":
+                token["logo_seq"] = sequence[key]
+            start, pos = parser.field(raw, start)
+            if key in _SEQUENCE_ONLY:
+                continue
+            if key == "logo":
+                # base64, the bytes between the quotes are the value, and the
+                # search resumes after it
+                if pos - start > 2:
+                    token["logo_offset"] = start + 1
+                    token["logo_length"] = pos - start - 2
+            else:
+                value = parser.decode(raw, start, pos)
+                if value is not None:
+                    token[key] = value
+    except UnicodeDecodeError:
+        return None
+    token["sequence"] = ",".join(f"{key}:{seq}" for key, seq in sorted(sequence.items()))
+    return token
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def to_columns(tokens) -> Dict[str, np.ndarray]:
+    columns = {}
+    for name, dtype in COLUMNS.items():
+        values = [t[name] for t in tokens]
+        if dtype == "U":
+            width = max((len(v) for v in values), default=0) or 1
+            dtype = f"<U{width}"
+        columns[name] = np.array(values, dtype=dtype)
+    return columns
+
+
+def write_snapshot(columns: Dict[str, np.ndarray], path: Path = SNAPSHOT_PATH, **meta):
+    rows = len(next(iter(columns.values()))) if columns else 0
+    layout = []
+    # offsets are relative to the start of the data section, which begins at the
+    # first aligned position after the header
+    offset = 0
+    for name, array in columns.items():
+        layout.append({"name": name, "dtype": array.dtype.str, "offset": offset})
+        offset = _align(offset + array.nbytes)
+
+    header = {"version": FORMAT_VERSION, "rows": rows, "columns": layout, **meta}
+    header_bytes = json.dumps(header).encode()
+    prefix = MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes
+    data_start = _align(len(prefix))
+
+    # readers (the mmap of other workers) never see a half written file
+    with atomic_write(path, "wb") as fw:
+        fw.write(prefix)
+        for column, array in zip(layout, columns.values()):
+            fw.write(b"\0" * (data_start + column["offset"] - fw.tell()))
+            fw.write(np.ascontiguousarray(array).tobytes())
+
+
+def read_header(path: Path = SNAPSHOT_PATH) -> dict:
+    with open(path, "rb") as fr:
+        if fr.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a token registry snapshot")
+        (length,) = struct.unpack("<I", fr.read(4))
+        header = json.loads(fr.read(length))
+    header["data_start"] = _align(len(MAGIC) + 4 + length)
+    return header
+
+
+def open_snapshot(path: Path = SNAPSHOT_PATH) -> Dict[str, np.ndarray]:
+    """Memory-map all columns of a snapshot, read only."""
+    header = read_header(path)
+    if header["version"] != FORMAT_VERSION:
+        raise ValueError(f"unsupported snapshot version {header['version']}")
+    rows = header["rows"]
+    columns = {}
+    for column in header["columns"]:
+        if rows == 0:
+            columns[column["name"]] = np.empty(0, dtype=column["dtype"])
+            continue
+        columns[column["name"]] = np.memmap(
+            path, dtype=column["dtype"], mode="r", offset=header["data_start"] + column["offset"], shape=(rows,)
+        )
+    return columns
+
+
+def file_stats(path: Path) -> Dict[str, Tuple[int, int]]:
+    """(size, mtime) by file name, for a directory or a single file; empty when missing."""
+    if path.is_dir():
+        entries = os.scandir(path)
+    elif path.exists():
+        entries = [path]
+    else:
+        return {}
+    stats = {}
+    for entry in entries:
+        stat = entry.stat()
+        stats[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return stats
+
+
+def source_signature(*paths: Path) -> Optional[str]:
+    """Cheap fingerprint of files and directories, based on names, sizes and mtimes.
+
+    Returns None when none of the paths exist (e.g. the mappings are not shipped).
+    """
+    digest = hashlib.sha1()
+    found = False
+    for path in paths:
+        stats = file_stats(path)
+        found = found or path.exists()
+        for name in sorted(stats):
+            size, mtime = stats[name]
+            digest.update(f"{name}:{size}:{mtime};".encode())
+    return digest.hexdigest() if found else None
+
+
+def signatures_path(path: Path = SNAPSHOT_PATH) -> Path:
+    """Signature check results kept next to the snapshot they went into."""
+    return path.with_name("signatures.json")
+
+
+def build_snapshot(mappings_dir: Path = MAPPINGS_DIR, path: Path = SNAPSHOT_PATH) -> Dict[str, np.ndarray]:
+    source = source_signature(mappings_dir)
+    token_paths = sorted(mappings_dir.iterdir())
+    with ThreadPoolExecutor() as executor:
+        tokens = [t for t in executor.map(load_token, token_paths) if t is not None]
+    SignatureCache(signatures_path(path)).update(tokens, mappings_dir)
+    columns = to_columns(tokens)
+    write_snapshot(columns, path, source=source)
+    return open_snapshot(path)
+
+
+def load_snapshot(path: Path = SNAPSHOT_PATH, mappings_dir: Path = MAPPINGS_DIR) -> Dict[str, np.ndarray]:
+    """Open the prebuilt snapshot, compiling it first if it is missing or stale.
+
+    Without a mappings directory (as in the deployed wheel) the snapshot is used as is.
+    """
+    if not path.exists():
+        return build_snapshot(mappings_dir, path)
+    source = source_signature(mappings_dir)
+    header = read_header(path)
+    if source is not None and (header.get("source") != source or header["version"] != FORMAT_VERSION):
+        return build_snapshot(mappings_dir, path)
+    return open_snapshot(path)
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    columns = build_snapshot()
+    print(f"wrote {len(columns['subject'])} tokens to {SNAPSHOT_PATH} in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,59 @@
+"""Index of the minswap verified tokens (public/tokens/tokens.json)
+
+Verified entries are keyed by policy ID. A Cardano subject is the policy ID
+(56 hex chars) followed by the asset name, so almost every lookup is a single
+dict hit on subject[:56]. Keys of any other length go into a small prefix trie
+so they still match the way a plain startswith scan would.
+"""
+from typing import Dict, Iterable, List, Optional
+
+POLICY_ID_LENGTH = 56
+
+# marks the end of a key in the trie, maps to the key's position in tokens.json
+_END = ""
+
+
+class VerifiedIndex:
+    def __init__(self, verified_info: Dict[str, dict]):
+        self.info = verified_info
+        # position in tokens.json, the first matching key wins like it did with the scan
+        self.position = {key: i for i, key in enumerate(verified_info)}
+        self.by_policy = {key: key for key in verified_info if len(key) == POLICY_ID_LENGTH}
+        self.trie: dict = {}
+        for key in verified_info:
+            if len(key) != POLICY_ID_LENGTH:
+                self._insert(key)
+
+    def _insert(self, key: str):
+        node = self.trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[_END] = key
+
+    def _trie_matches(self, subject: str) -> List[str]:
+        matches = []
+        node = self.trie
+        if _END in node:
+            matches.append(node[_END])
+        for char in subject:
+            node = node.get(char)
+            if node is None:
+                break
+            if _END in node:
+                matches.append(node[_END])
+        return matches
+
+    def match(self, subject: str) -> Optional[str]:
+        """Return the verified key that prefixes subject, or None."""
+        key = self.by_policy.get(subject[:POLICY_ID_LENGTH])
+        if not self.trie:
+            return key
+        candidates = self._trie_matches(subject)
+        if key is not None:
+            candidates.append(key)
+        if not candidates:
+            return None
+        return min(candidates, key=self.position.__getitem__)
+
+    def match_all(self, subjects: Iterable[str]) -> List[Optional[str]]:
+        return [self.match(subject) for subject in subjects]
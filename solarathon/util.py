@@ -0,0 +1,65 @@
+"""Small helpers shared by the registry, market data and component modules
+
+    - atomic_write: the caches and the snapshot are read by other sessions and
+      processes while they are rewritten, a file is written next to its path
+      and moved over it, so readers see the old or the new file, never half
+    - spawn_pool: a process pool whose workers are spawned. Thumbnails,
+      signature checks and backtest sweeps also run inside the solara server,
+      which is threaded, and a forked worker can inherit a lock some other
+      thread held at the fork and deadlock on it
+    - FrameCache: values derived from a data frame (indexes, sort orders),
+      for frames shared by every session
+"""
+import contextlib
+import threading
+import weakref
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Generic, Hashable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@contextlib.contextmanager
+def atomic_write(path: Path, mode: str = "w") -> Iterator[IO]:
+    """Open a temporary file for writing, moved over path when the block succeeds."""
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    try:
+        with open(tmp_path, mode) as fw:
+            yield fw
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    tmp_path.replace(path)
+
+
+def spawn_pool(max_workers: Optional[int] = None):
+    """ProcessPoolExecutor with spawned workers."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+class FrameCache(Generic[T]):
+    """Values derived from a frame, built once per frame and dropped together with it.
+
+    A frame like the registry's is shared by every session and replaced on a
+    new version, the first sessions to ask share a single build.
+    """
+
+    def __init__(self, build: Callable[..., T]):
+        self.build = build
+        # id(frame) -> key -> value
+        self._values: Dict[int, Dict[Hashable, T]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, frame: Any, *args, key: Hashable = None) -> T:
+        """The value of frame and key, build(frame, *args) the first time."""
+        with self._lock:
+            values = self._values.get(id(frame))
+            if values is None:
+                values = self._values[id(frame)] = {}
+                weakref.finalize(frame, self._values.pop, id(frame), None)
+            if key not in values:
+                values[key] = self.build(frame, *args)
+            return values[key]
@@ -0,0 +1,23 @@
+from solarathon.market.symbols import SymbolIndex
+
+
+def pair(symbol, base, quote):
+    return {"symbol": symbol, "baseAsset": base, "quoteAsset": quote, "status": "TRADING"}
+
+
+def test_binance_pair_in_the_requested_quote():
+    index = SymbolIndex([pair("BTCUSDT", "BTC", "USDT"), pair("BTCUSD", "BTC", "USD")], [])
+    assert index.binance("btc", "USDT") == "BTCUSDT"
+    assert index.binance("btc", "USD") == "BTCUSD"
+
+
+def test_binance_pair_listed_only_against_the_other_quote():
+    index = SymbolIndex([pair("FOOUSD", "FOO", "USD")], [])
+    assert index.binance("foo", "USDT") == "FOOUSD"
+    assert index.binance("foo", "USD") == "FOOUSD"
+
+
+def test_binance_pair_of_an_unlisted_asset():
+    index = SymbolIndex([], [])
+    assert index.binance("steth", "USDT") == "STETHUSDT"
+    assert "steth" not in index.binance_bases